@@ -0,0 +1,238 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from cube import ClimateCube
+from part1 import central_tendency, profile, quantiles
+from part2 import (
+    CLIMATE_VARIABLES,
+    aggregate_by_season,
+    discretization,
+    eliminate_redundancies,
+    fill_missing,
+    merge_data,
+    normalize_data,
+    outlier,
+)
+
+# Benchmarks des fonctions de part1 / part2 sur des donnees synthetiques au schema reel
+# (grille lon/lat, temps mensuel, 6 variables climatiques, 24 colonnes de sol, polygones WKT).
+# Les resultats sont ecrits en JSON et compares a une reference : une regression au-dela
+# de la tolerance fait echouer la commande (code de sortie 1).
+
+SOIL_COLUMNS = [
+    "sand % topsoil", "sand % subsoil", "silt % topsoil", "silt% subsoil", "clay % topsoil",
+    "clay % subsoil", "pH water topsoil", "pH water subsoil", "OC % topsoil", "OC % subsoil",
+    "N % topsoil", "N % subsoil", "BS % topsoil", "BS % subsoil", "CEC topsoil", "CEC subsoil",
+    "CEC clay topsoil", "CEC Clay subsoil", "CaCO3 % topsoil", "CaCO3 % subsoil", "BD topsoil",
+    "BD subsoil", "C/N topsoil", "C/N subsoil",
+]
+# Emprise de l'Algerie [lon min, lon max, lat min, lat max]
+EXTENT = [-9.0, 12.0, 19.0, 37.0]
+MONTHS = 12
+DEFAULT_SIZES = [10**4, 10**5, 10**6]
+DEFAULT_TOLERANCE = 0.25
+# En dessous de cette duree, les ecarts relatifs sont du bruit de mesure
+MIN_SECONDS = 0.02
+
+
+def _grid(cells):
+    nx = math.ceil(math.sqrt(cells))
+    ny = math.ceil(cells / nx)
+    lons = np.linspace(EXTENT[0], EXTENT[1], nx, endpoint=False)
+    lats = np.linspace(EXTENT[2], EXTENT[3], ny, endpoint=False)
+    lon, lat = np.meshgrid(lons, lats)
+    return lon.ravel()[:cells], lat.ravel()[:cells]
+
+
+# Donnees climatiques mensuelles : rows lignes = cellules x MONTHS mois
+def synthetic_climate(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    cells = max(1, rows // MONTHS)
+    lon, lat = _grid(cells)
+    times = pd.date_range("2019-01-01", periods=MONTHS, freq="MS")
+    data = pd.DataFrame({
+        "time": np.repeat(times.to_numpy(), cells),
+        "lon": np.tile(lon, MONTHS).astype("float32"),
+        "lat": np.tile(lat, MONTHS).astype("float32"),
+    })
+    scales = {"PSurf": (95000, 3000), "Qair": (0.006, 0.002), "Rainf": (1e-6, 1e-6),
+              "Snowf": (0.0, 1e-8), "Tair": (295, 8), "Wind": (4, 1.5)}
+    for variable in CLIMATE_VARIABLES:
+        mean, std = scales[variable]
+        data[variable] = rng.normal(mean, std, len(data)).astype("float32")
+    return data
+
+
+# Polygones de sol : un carre densifie (vertices) par case d'une grille grossiere
+def synthetic_soil(n_polygons=400, vertices=200, seed=0):
+    rng = np.random.default_rng(seed)
+    side = math.ceil(math.sqrt(n_polygons))
+    width = (EXTENT[1] - EXTENT[0]) / side
+    height = (EXTENT[3] - EXTENT[2]) / side
+    x0 = EXTENT[0] + width * (np.arange(n_polygons) % side)
+    y0 = EXTENT[2] + height * (np.arange(n_polygons) // side)
+    boxes = shapely.box(x0, y0, x0 + width, y0 + height)
+    boxes = shapely.segmentize(boxes, 2 * (width + height) / vertices)
+    soil = pd.DataFrame(rng.uniform(0, 100, (n_polygons, len(SOIL_COLUMNS))), columns=SOIL_COLUMNS)
+    soil["geometry"] = shapely.to_wkt(boxes, rounding_precision=6)
+    return soil
+
+
+# Donnees fusionnees (schema de sortie de merge_data apres agregation) pour part1 / part2
+def synthetic_dataset(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = synthetic_climate(rows, seed).drop(columns="time")
+    data["season"] = rng.choice(["Spring", "Summer", "Autumn", "Winter"], len(data))
+    soil = rng.uniform(0, 100, (len(data), len(SOIL_COLUMNS))).astype("float32")
+    data = pd.concat([data, pd.DataFrame(soil, columns=SOIL_COLUMNS)], axis=1)
+    # Quelques valeurs manquantes et une colonne dupliquee
+    data.loc[rng.random(len(data)) < 0.01, "Tair"] = np.nan
+    data["Tair copy"] = data["Tair"]
+    return data
+
+
+def _soil_geo(soil):
+    import geopandas as gpd
+    return gpd.GeoDataFrame(soil.drop(columns="geometry"), geometry=shapely.from_wkt(soil["geometry"].to_numpy()),
+                            crs="EPSG:4326")
+
+
+# Cas mesures : nom -> (jeu de donnees, fonction)
+CASES = {
+    "outlier_zscore": ("dataset", lambda d: outlier(d, "zscore")),
+    "outlier_iqr": ("dataset", lambda d: outlier(d, "IQR")),
+    "outlier_clipping": ("dataset", lambda d: outlier(d, "Clipping")),
+    "normalize_minmax": ("dataset", lambda d: normalize_data(d, "minmax")),
+    "normalize_zscore": ("dataset", lambda d: normalize_data(d, "zscore")),
+    "discretization": ("dataset", lambda d: discretization(d, SOIL_COLUMNS, 5)),
+    "fill_missing_mean": ("dataset", lambda d: fill_missing(d, ["Tair"], "mean")),
+    "redundancies_vertical": ("dataset", lambda d: eliminate_redundancies(d, "vertical")),
+    "redundancies_horizontal": ("dataset", lambda d: eliminate_redundancies(d, "horizontal")),
+    "profile": ("dataset", lambda d: profile(d)),
+    "central_tendency": ("dataset", lambda d: central_tendency(d, "Tair")),
+    "quantiles": ("dataset", lambda d: quantiles(d.dropna(subset=["Tair"]), "Tair")),
+    "aggregate_by_season": ("climate", lambda d: aggregate_by_season(d)),
+    "aggregate_by_season_cube": ("cube", lambda d: aggregate_by_season(d)),
+    "merge_data": ("climate_soil", lambda d: merge_data(d[0], d[1], lookup_path=None)),
+}
+
+
+def _inputs(kind, rows, seed):
+    if kind == "dataset":
+        return synthetic_dataset(rows, seed)
+    if kind == "climate":
+        return synthetic_climate(rows, seed)
+    if kind == "cube":
+        return ClimateCube.from_frame(synthetic_climate(rows, seed))
+    return synthetic_climate(rows, seed), _soil_geo(synthetic_soil(seed=seed))
+
+
+# Temps (meilleur de `repeat` executions) puis memoire de pointe (execution separee sous
+# tracemalloc, qui ralentit le code mesure)
+def measure(func, data, repeat=3):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(seconds), peak / 2**20
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, cases=None, repeat=3, seed=0, verbose=True):
+    results = []
+    for rows in sizes:
+        inputs = {}
+        for name in cases or CASES:
+            kind, func = CASES[name]
+            if kind not in inputs:
+                inputs[kind] = _inputs(kind, rows, seed)
+            seconds, peak = measure(func, inputs[kind], repeat)
+            results.append({"case": name, "rows": rows, "seconds": seconds, "peak_memory_mb": peak})
+            if verbose:
+                print(f"{name:25s} {rows:>10d} {seconds:10.4f} s {peak:10.1f} Mo", flush=True)
+    return results
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+# Regressions par rapport a la reference (temps et memoire au-dela de la tolerance relative)
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_seconds=MIN_SECONDS):
+    reference = {(r["case"], r["rows"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = reference.get((result["case"], result["rows"]))
+        if base is None:
+            continue
+        for metric in ("seconds", "peak_memory_mb"):
+            if metric == "seconds" and max(result[metric], base[metric]) < min_seconds:
+                continue
+            if result[metric] > base[metric] * (1 + tolerance):
+                regressions.append({
+                    "case": result["case"],
+                    "rows": result["rows"],
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": result[metric],
+                    "ratio": result[metric] / base[metric] if base[metric] else math.inf,
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des pretraitements (part1 / part2)")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES, help="ex. 1e4 1e5 1e6 1e7")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="fichier JSON de reference a comparer")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_benchmarks([int(size) for size in args.sizes], args.cases, args.repeat, args.seed)
+    save_results(results, args.output)
+    print(f"Resultats ecrits dans {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} ({r['rows']} lignes) {r['metric']} : "
+                  f"{r['baseline']:.4f} -> {r['current']:.4f} (x{r['ratio']:.2f})")
+        if regressions:
+            sys.exit(1)
+        print("Aucune regression par rapport a la reference")
+
+
+if __name__ == "__main__":
+    main()
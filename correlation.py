@@ -0,0 +1,169 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations_with_replacement
+
+import numpy as np
+import pandas as pd
+
+# Correlations par blocs de colonnes, sur les lignes completes de chaque paire (comme df.corr()).
+# Pour un bloc de colonnes I et un bloc J, toutes les sommes necessaires (effectifs, sommes,
+# sommes des carres, produits croises) sont des produits matriciels entre les valeurs (NaN -> 0)
+# et les masques de presence : additives sur les lignes, donc aussi calculables chunk par chunk.
+
+DEFAULT_BLOCK_SIZE = 64
+METHODS = ("pearson", "spearman")
+
+
+def _prepare(values, shift):
+    mask = ~np.isnan(values)
+    # Decalage par la moyenne : evite la perte de precision des sommes brutes
+    values = np.where(mask, values - shift, 0.0)
+    return values, mask.astype("float64")
+
+
+def _nanmean(values):
+    count = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(values, axis=0) / count
+
+
+def _block_sums(x, mx, y, my):
+    return np.stack([
+        mx.T @ my,
+        x.T @ my,
+        mx.T @ y,
+        (x * x).T @ my,
+        mx.T @ (y * y),
+        x.T @ y,
+    ])
+
+
+def _block_task(args):
+    x, mx, y, my = args
+    return _block_sums(x, mx, y, my)
+
+
+def _corr_from_sums(sums, min_periods=1):
+    n, sx, sy, sxx, syy, sxy = sums
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < max(min_periods, 2)) | (var_x <= 0) | (var_y <= 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _column_blocks(size, block_size):
+    return [slice(start, min(start + block_size, size)) for start in range(0, size, block_size)]
+
+
+def _values(df, cols, method):
+    data = df[cols]
+    if method == "spearman":
+        # Rangs moyens par colonne (les NaN restent NaN)
+        data = data.rank(method="average")
+    return data.to_numpy(dtype="float64", na_value=np.nan)
+
+
+# Matrice de correlation (pearson ou spearman) calculee par blocs de block_size colonnes.
+# workers > 1 repartit les paires de blocs sur un pool de processus (tableaux tres larges).
+# Spearman : rangs calcules une fois par colonne ; identique a df.corr("spearman") sans
+# valeurs manquantes, approche si les NaN d'une colonne different d'une paire a l'autre.
+def correlation_matrix(df, cols=None, method="pearson", block_size=DEFAULT_BLOCK_SIZE,
+                       workers=None, min_periods=1):
+    if method not in METHODS:
+        raise ValueError("Invalid method. Choose 'pearson' or 'spearman'.")
+    if cols is None:
+        cols = df.select_dtypes(include="number").columns.tolist()
+    values = _values(df, cols, method)
+    x, mask = _prepare(values, np.nan_to_num(_nanmean(values)))
+
+    blocks = _column_blocks(len(cols), block_size)
+    pairs = list(combinations_with_replacement(range(len(blocks)), 2))
+    tasks = [(x[:, blocks[i]], mask[:, blocks[i]], x[:, blocks[j]], mask[:, blocks[j]]) for i, j in pairs]
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_block_task, tasks))
+    else:
+        results = [_block_task(task) for task in tasks]
+
+    corr = np.empty((len(cols), len(cols)))
+    for (i, j), sums in zip(pairs, results):
+        block = _corr_from_sums(sums, min_periods)
+        corr[blocks[i], blocks[j]] = block
+        corr[blocks[j], blocks[i]] = block.T
+    diagonal = np.diag_indices(len(cols))
+    corr[diagonal] = np.where(np.isnan(corr[diagonal]), np.nan, 1.0)
+    return pd.DataFrame(corr, index=cols, columns=cols)
+
+
+# Correlation de Pearson accumulee chunk par chunk (fichiers plus grands que la memoire).
+# Les sommes de deux accumulateurs (meme decalage) s'additionnent : merge possible.
+class CorrelationAccumulator:
+    def __init__(self, cols):
+        self.cols = list(cols)
+        self.shift = None
+        self.sums = np.zeros((6, len(self.cols), len(self.cols)))
+
+    def update(self, chunk):
+        values = chunk[self.cols].to_numpy(dtype="float64", na_value=np.nan)
+        if self.shift is None:
+            # Decalage fixe par la moyenne du premier chunk
+            self.shift = np.nan_to_num(_nanmean(values))
+        x, mask = _prepare(values, self.shift)
+        self.sums += _block_sums(x, mask, x, mask)
+        return self
+
+    def merge(self, other):
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift, self.sums = other.shift, other.sums.copy()
+            return self
+        if not np.array_equal(self.shift, other.shift):
+            other = other._reshifted(self.shift)
+        self.sums += other.sums
+        return self
+
+    # Memes sommes exprimees avec un autre decalage
+    def _reshifted(self, shift):
+        n, sx, sy, sxx, syy, sxy = self.sums
+        dx = (self.shift - shift)[:, None]
+        dy = (self.shift - shift)[None, :]
+        moved = CorrelationAccumulator(self.cols)
+        moved.shift = shift
+        moved.sums = np.stack([
+            n,
+            sx + dx * n,
+            sy + dy * n,
+            sxx + 2 * dx * sx + dx * dx * n,
+            syy + 2 * dy * sy + dy * dy * n,
+            sxy + dx * sy + dy * sx + dx * dy * n,
+        ])
+        return moved
+
+    def correlation(self, min_periods=1):
+        corr = _corr_from_sums(self.sums.copy(), min_periods)
+        diagonal = np.diag_indices(len(self.cols))
+        corr[diagonal] = np.where(np.isnan(corr[diagonal]), np.nan, 1.0)
+        return pd.DataFrame(corr, index=self.cols, columns=self.cols)
+
+
+# Les k paires les plus correlees (en valeur absolue) au-dessus du seuil
+def top_k_pairs(corr, k=10, threshold=0.0):
+    values = corr.to_numpy()
+    i, j = np.triu_indices(len(corr), k=1)
+    pair_corr = values[i, j]
+    strength = np.abs(pair_corr)
+    keep = np.flatnonzero(strength >= threshold)
+    keep = keep[np.argsort(-strength[keep], kind="stable")][:k]
+    return pd.DataFrame({
+        "col1": corr.index[i[keep]],
+        "col2": corr.columns[j[keep]],
+        "correlation": pair_corr[keep],
+    })
+
+
+# Colonnes apparaissant dans les paires selectionnees (bloc a afficher dans la heatmap)
+def pair_columns(pairs):
+    return list(dict.fromkeys(pairs[["col1", "col2"]].to_numpy().ravel()))
@@ -0,0 +1,196 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Stockage dense des donnees climatiques sur la grille reguliere : un tableau float32
+# (time, lat, lon, variable) en memory-map (values.npy), les vecteurs de coordonnees
+# (time.npy, lat.npy, lon.npy) et le masque du pays (mask.npy, lat x lon) a part.
+# Les coordonnees ne sont plus repetees sur chaque ligne ; une cellule hors du masque ou
+# un mois absent vaut NaN. Les moyennes saisonnieres, statistiques par cellule et
+# extractions sont des reductions / decoupages du tableau, lu par blocs de pas de temps.
+
+COORDINATES = ["time", "lon", "lat"]
+# Nombre de pas de temps lus a la fois dans les reductions (memoire bornee)
+DEFAULT_TIME_CHUNK = 12
+
+
+class ClimateCube:
+    def __init__(self, values, times, lats, lons, variables, mask=None, path=None):
+        self.values = values
+        self.times = np.asarray(times)
+        self.lats = np.asarray(lats)
+        self.lons = np.asarray(lons)
+        self.variables = list(variables)
+        self.mask = np.ones(values.shape[1:3], dtype=bool) if mask is None else np.asarray(mask)
+        self.path = path
+        if values.shape != (len(self.times), len(self.lats), len(self.lons), len(self.variables)):
+            raise ValueError(f"Cube shape {values.shape} does not match its coordinates")
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __repr__(self):
+        return (f"ClimateCube(time={len(self.times)}, lat={len(self.lats)}, lon={len(self.lons)}, "
+                f"variables={self.variables})")
+
+    # Construction a partir du format long (une ligne par time, lon, lat)
+    @classmethod
+    def from_frame(cls, data, variables=None):
+        if variables is None:
+            variables = [col for col in data.select_dtypes(include="number").columns if col not in COORDINATES]
+        times, t = np.unique(pd.to_datetime(data["time"]).to_numpy(), return_inverse=True)
+        lats, y = np.unique(data["lat"].to_numpy(), return_inverse=True)
+        lons, x = np.unique(data["lon"].to_numpy(), return_inverse=True)
+        values = np.full((len(times), len(lats), len(lons), len(variables)), np.nan, dtype="float32")
+        values[t, y, x] = data[variables].to_numpy(dtype="float32")
+        mask = np.zeros((len(lats), len(lons)), dtype=bool)
+        mask[y, x] = True
+        return cls(values, times, lats, lons, variables, mask)
+
+    # Nouveau cube sur disque, rempli de NaN : values est un memory-map en ecriture (r+)
+    # que l'appelant remplit directement, sans tableau dense en memoire
+    @classmethod
+    def create(cls, directory, times, lats, lons, variables, mask=None):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        shape = (len(times), len(lats), len(lons), len(variables))
+        values = np.lib.format.open_memmap(directory / "values.npy", mode="w+", dtype="float32", shape=shape)
+        for start in range(0, len(times), DEFAULT_TIME_CHUNK):
+            values[start:start + DEFAULT_TIME_CHUNK] = np.nan
+        mask = np.ones(shape[1:3], dtype=bool) if mask is None else np.asarray(mask)
+        np.save(directory / "time.npy", np.asarray(times).astype("datetime64[ns]"))
+        np.save(directory / "lat.npy", np.asarray(lats))
+        np.save(directory / "lon.npy", np.asarray(lons))
+        np.save(directory / "mask.npy", mask)
+        with open(directory / "cube.json", "w") as f:
+            json.dump({"variables": list(variables), "shape": list(shape)}, f)
+        return cls(values, times, lats, lons, variables, mask, path=directory)
+
+    # Ecriture dans un dossier ; retourne le cube relu en memory-map
+    def save(self, directory):
+        out = ClimateCube.create(directory, self.times, self.lats, self.lons, self.variables, self.mask)
+        for start in range(0, len(self.times), DEFAULT_TIME_CHUNK):
+            out.values[start:start + DEFAULT_TIME_CHUNK] = self.values[start:start + DEFAULT_TIME_CHUNK]
+        out.values.flush()
+        del out
+        return ClimateCube.load(directory)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        directory = Path(directory)
+        with open(directory / "cube.json") as f:
+            meta = json.load(f)
+        return cls(
+            np.load(directory / "values.npy", mmap_mode=mmap_mode),
+            np.load(directory / "time.npy"),
+            np.load(directory / "lat.npy"),
+            np.load(directory / "lon.npy"),
+            meta["variables"],
+            np.load(directory / "mask.npy"),
+            path=directory,
+        )
+
+    # Un cube relu depuis le disque se serialise par son chemin (pas de copie du tableau)
+    def __reduce__(self):
+        if self.path is not None:
+            return ClimateCube.load, (self.path,)
+        return ClimateCube, (np.asarray(self.values), self.times, self.lats, self.lons, self.variables, self.mask)
+
+    # Extraction : periode [start, stop], bornes lat / lon incluses, sous-ensemble de variables.
+    # Les bornes donnent des tranches du tableau (vues sur le memory-map, sans lecture).
+    def select(self, time=None, lat=None, lon=None, variables=None):
+        t = _range(self.times, time, np.datetime64)
+        y = _range(self.lats, lat)
+        x = _range(self.lons, lon)
+        values = self.values[t, y, x]
+        names = self.variables
+        if variables is not None:
+            names = list(variables)
+            values = values[..., [self.variables.index(name) for name in names]]
+        return ClimateCube(values, self.times[t], self.lats[y], self.lons[x], names, self.mask[y, x])
+
+    # Blocs de pas de temps en float64 : (debut, bloc)
+    def _chunks(self, time_chunk):
+        for start in range(0, len(self.times), time_chunk):
+            yield start, np.asarray(self.values[start:start + time_chunk], dtype="float64")
+
+    # Moyennes le long du temps par groupe de pas de temps (labels : un groupe par pas de temps,
+    # par ex. la saison). Retourne (groupes tries, tableau groupe x lat x lon x variable).
+    def group_means(self, labels, time_chunk=DEFAULT_TIME_CHUNK):
+        groups, codes = np.unique(np.asarray(labels), return_inverse=True)
+        sums = np.zeros((len(groups),) + self.shape[1:], dtype="float64")
+        counts = np.zeros((len(groups),) + self.shape[1:], dtype="int64")
+        for start, block in self._chunks(time_chunk):
+            block_codes = codes[start:start + len(block)]
+            valid = ~np.isnan(block)
+            for g in np.unique(block_codes):
+                rows = block_codes == g
+                sums[g] += np.where(valid[rows], block[rows], 0).sum(axis=0)
+                counts[g] += valid[rows].sum(axis=0)
+        means = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+        return groups, means
+
+    # Statistiques par cellule et variable sur toute la periode (lat x lon x variable)
+    def cell_stats(self, time_chunk=DEFAULT_TIME_CHUNK):
+        count = np.zeros(self.shape[1:], dtype="int64")
+        total = np.zeros(self.shape[1:], dtype="float64")
+        squares = np.zeros(self.shape[1:], dtype="float64")
+        low = np.full(self.shape[1:], np.inf)
+        high = np.full(self.shape[1:], -np.inf)
+        shift = None
+        for _, block in self._chunks(time_chunk):
+            valid = ~np.isnan(block)
+            if shift is None:
+                # Decalage (premier bloc) pour limiter la perte de precision de la variance
+                shift = np.where(valid, block, 0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+            centered = np.where(valid, block - shift, 0)
+            count += valid.sum(axis=0)
+            total += centered.sum(axis=0)
+            squares += (centered ** 2).sum(axis=0)
+            # fmin / fmax ignorent les NaN
+            low = np.fmin(low, np.fmin.reduce(block, axis=0))
+            high = np.fmax(high, np.fmax.reduce(block, axis=0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            var = (squares - count * mean ** 2) / (count - 1)
+        empty = count == 0
+        low[empty] = high[empty] = np.nan
+        return {
+            "count": count,
+            "mean": mean + (0 if shift is None else shift),
+            "std": np.sqrt(np.where(count > 1, var, np.nan)),
+            "min": low,
+            "max": high,
+        }
+
+    # Cellules du masque, triees par (lon, lat) : indices (lat, lon)
+    def cells(self):
+        x, y = np.nonzero(self.mask.T)
+        return y, x
+
+    # Tableau (groupe, lat, lon, variable) -> format long (group_name, lon, lat, variables)
+    # pour les cellules du masque, trie par (groupe, lon, lat)
+    def grouped_frame(self, groups, values, group_name):
+        y, x = self.cells()
+        frame = pd.DataFrame(values[:, y, x].reshape(-1, len(self.variables)), columns=self.variables)
+        frame.insert(0, group_name, np.repeat(groups, len(y)))
+        frame.insert(1, "lon", np.tile(self.lons[x], len(groups)))
+        frame.insert(2, "lat", np.tile(self.lats[y], len(groups)))
+        return frame
+
+    # Retour au format long (time, lon, lat, variables) pour les cellules du masque
+    def to_frame(self):
+        return self.grouped_frame(self.times, np.asarray(self.values), "time")
+
+
+def _range(coords, bounds, kind=None):
+    if bounds is None:
+        return slice(None)
+    lower, upper = bounds
+    start = 0 if lower is None else np.searchsorted(coords, kind(lower) if kind else lower, side="left")
+    stop = len(coords) if upper is None else np.searchsorted(coords, kind(upper) if kind else upper, side="right")
+    return slice(start, stop)
+
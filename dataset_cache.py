@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pas de cache disque sans pyarrow
+    pa = None
+
+# Cache disque des datasets deja lus, partage par toutes les sessions et tous les processus.
+# Cle : sha256 du contenu du fichier importe (+ options de lecture). Valeur : fichier Feather
+# (Arrow IPC non compresse) relu en memory-map, sans nouveau parsing du CSV.
+# Taille totale bornee : les fichiers les moins recemment utilises sont supprimes.
+
+CACHE_DIR = ".dataset_cache"
+DEFAULT_MAX_SIZE_MB = 2048
+CHUNK_BYTES = 1 << 20
+
+
+def content_key(source, *options):
+    digest = hashlib.sha256()
+    if hasattr(source, "getbuffer"):
+        digest.update(source.getbuffer())
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+                digest.update(block)
+    digest.update(repr(options).encode())
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    def __init__(self, directory=CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.directory = Path(directory)
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return pa is not None
+
+    def _path(self, key):
+        return self.directory / f"{key}.feather"
+
+    # (DataFrame, metadata) ou None si absent
+    def get(self, key):
+        path = self._path(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+            # Date d'acces pour l'ordre LRU (partage entre processus via le systeme de fichiers)
+            os.utime(path)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        metadata = json.loads((table.schema.metadata or {}).get(b"dataset_cache", b"{}"))
+        # Une colonne par bloc : les colonnes numeriques et les codes des categories restent des
+        # vues sur le fichier memory-mappe (lecture seule, partagees par les processus)
+        return table.to_pandas(split_blocks=True), metadata
+
+    def put(self, key, df, metadata=None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # NaN gardes comme valeurs (pas de masque de nulls) : relecture sans copie
+        for i, name in enumerate(table.column_names):
+            if pa.types.is_floating(table.schema.field(i).type):
+                values = pa.array(df[name].to_numpy(), from_pandas=False)
+                table = table.set_column(i, table.schema.field(i), values)
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[b"dataset_cache"] = json.dumps(metadata or {}, default=str).encode()
+        table = table.replace_schema_metadata(schema_metadata)
+        # Ecriture dans un fichier temporaire puis renommage atomique (lecteurs concurrents)
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        # Un seul lot : un lot par tranche de lignes obligerait a concatener a la lecture
+        feather.write_feather(table, tmp, compression="uncompressed", chunksize=max(len(df), 1))
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        files = []
+        for path in self.directory.glob("*.feather"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return sorted(files)
+
+    def size_mb(self):
+        return sum(size for _, size, _ in self.entries()) / 2**20
+
+    # Suppression des fichiers les moins recemment utilises au-dela de max_size_mb
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        budget = self.max_size_mb * 2**20
+        for _, size, path in entries:
+            if total <= budget:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Fichier encore ouvert (memory-map d'un lecteur, Windows) : garde, et
+                # retente a la prochaine eviction
+                continue
+            total -= size
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries()) if self.directory.exists() else 0,
+            "size_mb": self.size_mb() if self.directory.exists() else 0.0,
+        }
@@ -0,0 +1,172 @@
+import argparse
+import numbers
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Suppression des lignes dupliquees en flux, sur plusieurs chunks et plusieurs fichiers.
+# Chaque ligne est resumee par un hash 64 bits (calcul vectorise par chunk) ; seuls les hashes
+# deja vus sont gardes : un tableau trie en memoire, vide sur disque (fichiers .npy tries,
+# lus en memory-map) quand il depasse memory_limit_mb.
+# Deux lignes differentes de meme hash sont confondues : probabilite ~ n**2 / 2**65.
+
+DEFAULT_MEMORY_LIMIT_MB = 64
+
+
+# Valeurs d'une colonne sous une forme comparable entre types et entre fichiers :
+# 1, 1.0 et True sont egaux, -0.0 == 0.0, tous les NaN sont egaux
+def comparable_values(col):
+    if pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+        values = col.to_numpy(dtype="float64", na_value=np.nan) + 0.0
+        values[np.isnan(values)] = np.nan
+        return values
+    return col.to_numpy(dtype=object)
+
+
+def _numeric_hashes(values, tolerance):
+    if tolerance is not None:
+        values = np.round(values / tolerance) + 0.0
+    return pd.util.hash_array(values)
+
+
+# Hash de chaque valeur d'une colonne, selon son type : dans une colonne object, les nombres
+# et les manquants sont hashes comme dans une colonne numerique, les chaines comme chaines et
+# les autres valeurs avec le nom de leur type (1 et '1' ont des hashes differents)
+def _column_hashes(values, tolerance):
+    if values.dtype != object:
+        return _numeric_hashes(values, tolerance)
+    numeric = pd.isna(values)
+    if pd.api.types.infer_dtype(values, skipna=True) == "string":
+        strings = ~numeric
+    else:
+        strings = np.array([isinstance(v, str) for v in values], dtype=bool)
+        numeric |= np.array([isinstance(v, numbers.Real) for v in values], dtype=bool)
+    hashes = np.empty(len(values), dtype="uint64")
+    hashes[strings] = pd.util.hash_array(values[strings])
+    if numeric.any():
+        parsed = pd.to_numeric(pd.Series(values[numeric], dtype=object).where(~pd.isna(values[numeric])))
+        hashes[numeric] = _numeric_hashes(parsed.to_numpy(dtype="float64", na_value=np.nan) + 0.0, tolerance)
+    others = ~(strings | numeric)
+    if others.any():
+        typed = pd.DataFrame({"type": [type(v).__name__ for v in values[others]], "value": values[others].astype(str)})
+        hashes[others] = pd.util.hash_pandas_object(typed, index=False).to_numpy()
+    return hashes
+
+
+# Hash de chaque ligne ; tolerance : les valeurs numeriques sont arrondies a un multiple
+# de tolerance (des lignes ne differant que par du bruit ont le meme hash)
+def row_hashes(df, subset=None, tolerance=None):
+    if subset is not None:
+        df = df[subset]
+    columns = {name: _column_hashes(comparable_values(df[name]), tolerance) for name in df.columns}
+    return pd.util.hash_pandas_object(pd.DataFrame(columns, index=range(len(df))), index=False).to_numpy()
+
+
+class RowDeduplicator:
+    def __init__(self, subset=None, tolerance=None, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, spill_dir=None):
+        self.subset = subset
+        self.tolerance = tolerance
+        self.memory_limit_mb = memory_limit_mb
+        self.spill_dir = spill_dir
+        self._own_dir = None
+        self._seen = np.empty(0, dtype="uint64")
+        self._runs = []
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _seen_before(self, hashes):
+        seen = np.zeros(hashes.size, dtype=bool)
+        for run in [self._seen] + [np.load(path, mmap_mode="r") for path in self._runs]:
+            if run.size:
+                position = np.minimum(np.searchsorted(run, hashes), run.size - 1)
+                seen |= run[position] == hashes
+        return seen
+
+    def _spill(self):
+        if self.spill_dir is None:
+            self._own_dir = self.spill_dir = tempfile.mkdtemp(prefix="dedup_")
+        path = os.path.join(self.spill_dir, f"run_{len(self._runs):05d}.npy")
+        np.save(path, self._seen)
+        self._runs.append(path)
+        self._seen = np.empty(0, dtype="uint64")
+
+    # Lignes du chunk jamais vues (premiere occurrence, ordre d'origine conserve)
+    def process(self, chunk):
+        hashes = row_hashes(chunk, self.subset, self.tolerance)
+        _, first = np.unique(hashes, return_index=True)
+        first = np.sort(first)
+        first = first[~self._seen_before(hashes[first])]
+
+        self._seen = np.union1d(self._seen, hashes[first])
+        if self._seen.nbytes > self.memory_limit_mb * 2**20:
+            self._spill()
+        self.rows_in += len(chunk)
+        self.rows_out += first.size
+        return chunk.iloc[first]
+
+    def iter_unique(self, chunks):
+        for chunk in chunks:
+            unique = self.process(chunk)
+            if len(unique):
+                yield unique
+
+    def stats(self):
+        return {
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "duplicates": self.rows_in - self.rows_out,
+            "spilled_runs": len(self._runs),
+        }
+
+    # Supprime les fichiers de hashes vides sur disque
+    def close(self):
+        for path in self._runs:
+            if os.path.exists(path):
+                os.remove(path)
+        self._runs = []
+        if self._own_dir is not None:
+            shutil.rmtree(self._own_dir, ignore_errors=True)
+            self._own_dir = self.spill_dir = None
+
+
+# Dedoublonnage de plusieurs CSV (lus par chunks) vers un seul CSV
+def deduplicate_csv(paths, output, chunksize=1_000_000, subset=None, tolerance=None,
+                    memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, spill_dir=None):
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    header = True
+    with RowDeduplicator(subset, tolerance, memory_limit_mb, spill_dir) as dedup:
+        for path in paths:
+            for unique in dedup.iter_unique(pd.read_csv(path, chunksize=chunksize)):
+                unique.to_csv(output, mode="w" if header else "a", header=header, index=False)
+                header = False
+        return dedup.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suppression des lignes dupliquees sur plusieurs CSV")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--subset", nargs="+", default=None)
+    parser.add_argument("--tolerance", type=float, default=None)
+    parser.add_argument("--memory-limit-mb", type=float, default=DEFAULT_MEMORY_LIMIT_MB)
+    parser.add_argument("--spill-dir", default=None)
+    args = parser.parse_args()
+    stats = deduplicate_csv(args.paths, args.output, args.chunksize, args.subset, args.tolerance,
+                            args.memory_limit_mb, args.spill_dir)
+    print(f"{stats['rows_in']} lignes lues, {stats['rows_out']} gardees, "
+          f"{stats['duplicates']} doublons, {stats['spilled_runs']} fichiers de hashes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import zipfile
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from spatial import DECIMALS, PolygonIndex, grid_cells
+
+# Table (lon, lat) -> indice du polygone de sol, calculee une seule fois et gardee sur disque
+GRID_LOOKUP_PATH = "soil_grid_lookup.npz"
+
+
+def _is_wkt(geometry):
+    return not isinstance(geometry, gpd.GeoSeries) and geometry.map(lambda g: isinstance(g, str)).all()
+
+
+# Empreinte des polygones de sol : la table est invalidee si elle change
+def soil_fingerprint(soil_data):
+    geometry = soil_data["geometry"]
+    if _is_wkt(geometry):
+        payload = geometry.str.cat(sep="\n").encode("utf-8")
+    else:
+        payload = b"".join(shapely.to_wkb(np.asarray(geometry, dtype=object)))
+    return hashlib.sha1(payload).hexdigest()
+
+
+def _cell_keys(lons, lats):
+    lons = np.round(np.asarray(lons, dtype="float64"), DECIMALS)
+    lats = np.round(np.asarray(lats, dtype="float64"), DECIMALS)
+    return lons, lats
+
+
+def _polygons(soil_data):
+    geometry = soil_data["geometry"]
+    if _is_wkt(geometry):
+        return shapely.from_wkt(geometry.to_numpy())
+    return np.asarray(geometry, dtype=object)
+
+
+# Test point dans polygone (STRtree + polygones prepares) sur les cellules distinctes uniquement
+def build_grid_lookup(lons, lats, soil_data, max_distance=None):
+    return PolygonIndex(_polygons(soil_data)).locate(lons, lats, max_distance)
+
+
+# Ecriture dans un fichier temporaire du meme dossier puis renommage atomique :
+# un lecteur concurrent ne voit jamais une table a moitie ecrite
+def save_grid_lookup(path, lons, lats, poly, fingerprint):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(f, lon=lons, lat=lats, poly=poly, fingerprint=np.array(fingerprint))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# Table stockee si elle couvre les cellules demandees ; None si absente, perimee ou illisible
+def _read_grid_lookup(path, fingerprint, wanted):
+    try:
+        with np.load(path) as stored:
+            if str(stored["fingerprint"]) != fingerprint:
+                return None
+            known = pd.MultiIndex.from_arrays([stored["lon"], stored["lat"]])
+            position = known.get_indexer(wanted)
+            if (position >= 0).all():
+                return stored["poly"][position]
+    except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+        # Fichier tronque ou corrompu : traite comme absent, la table est reconstruite
+        return None
+    return None
+
+
+def load_grid_lookup(lons, lats, soil_data, path=GRID_LOOKUP_PATH, max_distance=None):
+    lons, lats = _cell_keys(lons, lats)
+    # La distance de repli fait partie de la cle de la table
+    fingerprint = f"{soil_fingerprint(soil_data)}:{max_distance}"
+    wanted = pd.MultiIndex.from_arrays([lons, lats])
+
+    if path is not None and os.path.exists(path):
+        poly = _read_grid_lookup(path, fingerprint, wanted)
+        if poly is not None:
+            return poly
+
+    # Sol ou grille modifies : reconstruction pour les cellules demandees
+    poly = build_grid_lookup(lons, lats, soil_data, max_distance)
+    if path is not None:
+        save_grid_lookup(path, lons, lats, poly, fingerprint)
+    return poly
+
+
+# Indice du polygone de sol pour chaque ligne (-1 si hors de tous les polygones et au-dela
+# de max_distance)
+def soil_index(lons, lats, soil_data, path=GRID_LOOKUP_PATH, max_distance=None):
+    codes, cell_lons, cell_lats = grid_cells(lons, lats, DECIMALS)
+    poly = load_grid_lookup(cell_lons, cell_lats, soil_data, path, max_distance)
+    return poly[codes]
@@ -0,0 +1,235 @@
+import hashlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+from correlation import correlation_matrix
+from part1 import central_tendency, profile, quantiles
+from part2 import (
+    aggregate_by_season,
+    discretization,
+    eliminate_redundancies,
+    fill_missing,
+    normalize_data,
+    outlier,
+)
+
+# Budget memoire de l'historique (checkpoints + version courante) et frequence des checkpoints
+DEFAULT_MEMORY_BUDGET_MB = 512
+DEFAULT_CHECKPOINT_EVERY = 5
+
+
+# === Operations d'edition de l'interface 1 ===
+# Valeur incompatible avec le type compact de la colonne (choisi au chargement) : type elargi
+def _widen(column, value):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.add_categories([value])
+    if pd.api.types.is_numeric_dtype(column) and not isinstance(value, str):
+        return column.astype("float64")
+    return column.astype(object)
+
+
+def set_values(df, rows, col, value):
+    df_out = df.copy()
+    if pd.api.types.is_numeric_dtype(df_out[col]) and isinstance(value, str):
+        # Saisie texte de l'interface : nombre si possible
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    try:
+        df_out.loc[rows, col] = value
+    except (TypeError, ValueError):
+        df_out[col] = _widen(df_out[col], value)
+        df_out.loc[rows, col] = value
+    return df_out
+
+
+def drop_rows(df, rows):
+    return df.drop(index=rows).reset_index(drop=True)
+
+
+def rename_columns(df, mapping):
+    return df.rename(columns=mapping)
+
+
+def drop_columns(df, cols):
+    return df.drop(columns=cols).reset_index(drop=True)
+
+
+# Operations rejouables : nom -> fonction(df, **params) qui retourne un nouveau DataFrame
+OPERATIONS = {
+    "set_values": set_values,
+    "drop_rows": drop_rows,
+    "rename_columns": rename_columns,
+    "drop_columns": drop_columns,
+    "aggregate_by_season": aggregate_by_season,
+    "outlier": outlier,
+    "fill_missing": fill_missing,
+    "normalize_data": normalize_data,
+    "discretization": discretization,
+    "eliminate_redundancies": eliminate_redundancies,
+}
+
+
+# Statistiques mises en cache par version : nom -> fonction(df, col)
+STATISTICS = {
+    "describe": lambda df, col: df.describe(),
+    "profile": lambda df, col: profile(df),
+    "missing": lambda df, col: df.isnull().sum() if col is None else df[col].isnull().sum(),
+    "nunique": lambda df, col: df.nunique() if col is None else df[col].nunique(),
+    "std": lambda df, col: df[col].std(),
+    "var": lambda df, col: df[col].var(),
+    "central_tendency": lambda df, col: central_tendency(df, col),
+    "quantiles": lambda df, col: quantiles(df, col),
+    "numeric_columns": lambda df, col: df.select_dtypes(include="number").columns.tolist(),
+    "pearson": lambda df, col: correlation_matrix(df, method="pearson"),
+    "spearman": lambda df, col: correlation_matrix(df, method="spearman"),
+}
+
+
+# Empreinte du contenu d'un DataFrame (valeurs, index, noms et types des colonnes)
+def frame_fingerprint(df):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+    return digest.hexdigest()
+
+
+# Empreinte d'une version derivee : version parente + operation + parametres
+def operation_fingerprint(parent, name, params):
+    return hashlib.sha1(f"{parent}|{name}|{sorted(params.items())!r}".encode()).hexdigest()
+
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Taille approximative d'une statistique en cache (DataFrame, Series, tableau, tuple, ...)
+def value_memory(value):
+    if isinstance(value, pd.DataFrame):
+        return frame_memory(value)
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(value_memory(item) for item in value)
+    if isinstance(value, dict):
+        return sum(value_memory(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+# Historique des operations pour l'annulation.
+# Au lieu d'une copie complete apres chaque operation, on garde la liste des operations
+# (nom + parametres), quelques checkpoints complets et la version courante. Une version
+# anterieure est reconstruite en rejouant les operations depuis le checkpoint precedent.
+# Quand le budget memoire est depasse, les checkpoints intermediaires les plus anciens
+# sont supprimes (la version de depart est toujours gardee).
+# Chaque version a une empreinte ; les statistiques (describe, quantiles, ...) de la version
+# courante sont calculees a la demande une fois par colonne, puis reutilisees a chaque rerun
+# et sur les deux pages. Elles sont oubliees quand la version courante change et comptent
+# dans le budget memoire.
+class DataHistory:
+    def __init__(self, data=None, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                 checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        self.memory_budget_mb = memory_budget_mb
+        self.checkpoint_every = checkpoint_every
+        self.clear()
+        if data is not None:
+            self.load(data)
+
+    def clear(self):
+        self.operations = []
+        self.checkpoints = {}
+        self.fingerprints = []
+        self._sizes = {}
+        self._set_current(None)
+
+    def _set_current(self, data):
+        self.current = data
+        self._current_size = None
+        self._stats = {}
+        self._stats_size = 0
+
+    # Nouvelle version de depart (import d'un fichier)
+    def load(self, data):
+        self.clear()
+        self.checkpoints[0] = data
+        self.fingerprints.append(frame_fingerprint(data))
+        self._set_current(data)
+
+    # Nombre de versions disponibles (version de depart comprise)
+    def __len__(self):
+        return 0 if self.current is None else len(self.operations) + 1
+
+    @property
+    def version(self):
+        return len(self.operations)
+
+    @property
+    def fingerprint(self):
+        return self.fingerprints[-1] if self.fingerprints else None
+
+    # Statistique de la version courante (sur tout le DataFrame si col est None)
+    def stat(self, name, col=None):
+        key = (name, col)
+        if key not in self._stats:
+            self._stats[key] = STATISTICS[name](self.current, col)
+            self._stats_size += value_memory(self._stats[key])
+            self._enforce_budget()
+        return self._stats[key]
+
+    def apply(self, name, **params):
+        if self.current is None:
+            raise ValueError("No data loaded in history")
+        data = OPERATIONS[name](self.current, **params)
+        self.operations.append((name, params))
+        self.fingerprints.append(operation_fingerprint(self.fingerprint, name, params))
+        self._set_current(data)
+        if self.version % self.checkpoint_every == 0:
+            self.checkpoints[self.version] = data
+        self._enforce_budget()
+        return data
+
+    # Annule la derniere operation ; sans operation, retire aussi la version de depart
+    def pop(self):
+        if not self.operations:
+            self.clear()
+            return None
+        self.checkpoints.pop(self.version, None)
+        self._sizes.pop(self.version, None)
+        self.operations.pop()
+        self.fingerprints.pop()
+        self._set_current(self._materialize(self.version))
+        return self.current
+
+    def _materialize(self, version):
+        start = max(v for v in self.checkpoints if v <= version)
+        data = self.checkpoints[start]
+        for name, params in self.operations[start:version]:
+            data = OPERATIONS[name](data, **params)
+        return data
+
+    def _size(self, version, data):
+        if version not in self._sizes:
+            self._sizes[version] = frame_memory(data)
+        return self._sizes[version]
+
+    def memory_usage(self):
+        total = sum(self._size(v, data) for v, data in self.checkpoints.items())
+        if self.current is not None and self.version not in self.checkpoints:
+            if self._current_size is None:
+                self._current_size = frame_memory(self.current)
+            total += self._current_size
+        return total + self._stats_size
+
+    def _enforce_budget(self):
+        budget = self.memory_budget_mb * 2**20
+        while self.memory_usage() > budget:
+            droppable = [v for v in self.checkpoints if v not in (0, self.version)]
+            if not droppable:
+                break
+            oldest = min(droppable)
+            del self.checkpoints[oldest]
+            self._sizes.pop(oldest, None)
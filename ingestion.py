@@ -0,0 +1,165 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+import xarray as xr
+
+from cube import ClimateCube
+
+# Variables climatiques du jeu WFDE5 (noms des colonnes dans le dataset final)
+VARIABLES = ['PSurf', 'Qair', 'Rainf', 'Snowf', 'Tair', 'Wind']
+
+
+# Fichiers mensuels d'une variable (le prefixe n'a pas la meme casse partout : Psurf, tair, ...)
+def list_files(data_dir, variable):
+    prefix = f"{variable}_WFDE5_CRU_".lower()
+    files = [f for f in Path(data_dir).glob("*.nc") if f.name.lower().startswith(prefix)]
+    return sorted(files)
+
+
+# Geometrie du pays a partir du shapefile des frontieres
+def load_country_geometry(shapefile, country="Algeria", field="CNTRY_NAME"):
+    gdf = gpd.read_file(shapefile)
+    gdf = gdf[gdf[field] == country]
+    if gdf.empty:
+        raise ValueError(f"Country '{country}' not found in {shapefile}")
+    return gdf.to_crs("EPSG:4326").union_all()
+
+
+# Masque booleen (lat, lon) calcule une seule fois pour toute la grille
+def build_mask(lons, lats, geometry):
+    lon2d, lat2d = np.meshgrid(lons, lats)
+    shapely.prepare(geometry)
+    return shapely.contains_xy(geometry, lon2d, lat2d)
+
+
+def _data_variable(ds, variable):
+    for name in ds.data_vars:
+        if name.lower() == variable.lower():
+            return name
+    names = [name for name in ds.data_vars if ds[name].ndim == 3]
+    if len(names) != 1:
+        raise ValueError(f"Cannot find variable '{variable}' in dataset")
+    return names[0]
+
+
+# Traitement d'un fichier mensuel : lecture + masque applique en une operation sur le tableau
+def process_file(args):
+    file, variable, mask = args
+    with xr.open_dataset(file) as ds:
+        name = _data_variable(ds, variable)
+        da = ds[name].transpose("time", "lat", "lon")
+        values = da.values[:, mask].astype("float32")
+        times = da["time"].values
+        lats = da["lat"].values
+        lons = da["lon"].values
+
+    lat_idx, lon_idx = np.nonzero(mask)
+    n_cells = lat_idx.size
+    return pd.DataFrame({
+        "time": np.repeat(times, n_cells),
+        "lon": np.tile(lons[lon_idx], times.size),
+        "lat": np.tile(lats[lat_idx], times.size),
+        variable: values.ravel(),
+    })
+
+
+# Grille (lons, lats) et masque du pays
+def _grid_mask(file, geometry):
+    with xr.open_dataset(file) as ds:
+        lons, lats = ds["lon"].values, ds["lat"].values
+    return lons, lats, build_mask(lons, lats, geometry)
+
+
+# Cube (time, lat, lon, variable) ecrit directement dans le memory-map, fichier par fichier.
+# Les lignes d'un fichier suivent np.nonzero(mask) pour chaque pas de temps (process_file).
+def write_cube(directory, tasks, frames, variables, lons, lats, mask):
+    lat_order, lon_order = np.argsort(lats), np.argsort(lons)
+    lat_idx, lon_idx = np.nonzero(mask)
+    y = np.argsort(lat_order)[lat_idx]
+    x = np.argsort(lon_order)[lon_idx]
+    n_cells = lat_idx.size
+    times = np.unique(np.concatenate([frame["time"].to_numpy()[::n_cells] for frame in frames]))
+    cube = ClimateCube.create(directory, times, lats[lat_order], lons[lon_order], variables,
+                              mask[lat_order][:, lon_order])
+    for (_, variable, _), frame in zip(tasks, frames):
+        t = np.searchsorted(times, frame["time"].to_numpy()[::n_cells])
+        values = frame[variable].to_numpy().reshape(len(t), n_cells)
+        cube.values[t[:, None], y, x, variables.index(variable)] = values
+    cube.values.flush()
+    return ClimateCube.load(directory)
+
+
+# Ingestion de toutes les variables / tous les mois en parallele
+# cube : dossier ou ecrire aussi le cube (time, lat, lon, variable), voir cube.py
+def ingest(data_dir, country_shapefile, output="alldata.csv", variables=None,
+           workers=None, country="Algeria", country_field="CNTRY_NAME", cube=None):
+    variables = variables or VARIABLES
+    files = {variable: list_files(data_dir, variable) for variable in variables}
+    missing = [variable for variable, paths in files.items() if not paths]
+    if missing:
+        raise FileNotFoundError(f"No WFDE5 files found in {data_dir} for {missing}")
+
+    start = time.perf_counter()
+    geometry = load_country_geometry(country_shapefile, country, country_field)
+    # Toutes les variables partagent la meme grille : un seul masque
+    lons, lats, mask = _grid_mask(files[variables[0]][0], geometry)
+
+    tasks = [(file, variable, mask) for variable in variables for file in files[variable]]
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(process_file, tasks))
+    if cube is not None:
+        write_cube(cube, tasks, frames, list(variables), lons, lats, mask)
+
+    # Consolidation : une table longue par variable, jointe sur (time, lon, lat)
+    per_variable = {}
+    for (_, variable, _), frame in zip(tasks, frames):
+        per_variable.setdefault(variable, []).append(frame)
+    result = None
+    for variable in variables:
+        frame = pd.concat(per_variable[variable], ignore_index=True).set_index(["time", "lon", "lat"])
+        result = frame if result is None else result.join(frame, how="outer")
+    result = result.reset_index().sort_values(["time", "lon", "lat"], ignore_index=True)
+
+    if output is not None:
+        result.to_csv(output, index=False)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "files": len(tasks),
+        "rows": len(result),
+        "seconds": elapsed,
+        "files_per_sec": len(tasks) / elapsed if elapsed > 0 else float("inf"),
+    }
+    return result, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestion des fichiers NetCDF WFDE5 restreints a un pays")
+    parser.add_argument("data_dir", help="Dossier contenant les fichiers *_WFDE5_CRU_*.nc")
+    parser.add_argument("shapefile", help="Shapefile des frontieres des pays")
+    parser.add_argument("-o", "--output", default="alldata.csv")
+    parser.add_argument("--cube", default=None, help="dossier ou ecrire aussi le cube (time, lat, lon, variable)")
+    parser.add_argument("-v", "--variables", nargs="+", default=VARIABLES)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--country", default="Algeria")
+    parser.add_argument("--country-field", default="CNTRY_NAME")
+    args = parser.parse_args(argv)
+
+    _, stats = ingest(args.data_dir, args.shapefile, args.output, args.variables,
+                      args.workers, args.country, args.country_field, args.cube)
+    print(f"{stats['files']} fichiers, {stats['rows']} lignes en {stats['seconds']:.1f} s "
+          f"({stats['files_per_sec']:.2f} fichiers/s) -> {args.output}")
+    if args.cube:
+        print(f"Cube {ClimateCube.load(args.cube).shape} -> {args.cube}")
+
+
+if __name__ == "__main__":
+    main()
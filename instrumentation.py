@@ -0,0 +1,150 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Mesure des operations (part1 / part2) et des etapes d'affichage : temps reel, temps CPU,
+# memoire allouee de pointe (tracemalloc) et dimensions des entrees / sorties.
+# Les mesures ne sont prises que dans un bloc `with recording(recorder)` du thread courant
+# (une session Streamlit) ; sinon une fonction instrumentee ne coute qu'un test.
+# tracemalloc est global au processus : tant qu'une session enregistre, les allocations de
+# toutes les sessions sont tracees (et ralenties), et les pics de memoire sont ceux du
+# processus. Avec plusieurs sessions en diagnostic a la fois, les pics sont approximatifs.
+
+_local = threading.local()
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+class Recorder:
+    def __init__(self, log_path=None, max_records=500):
+        self.log_path = log_path
+        self.max_records = max_records
+        self.records = []
+        self._stack = []
+
+    def add(self, record):
+        self.records.append(record)
+        del self.records[:-self.max_records]
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def clear(self):
+        self.records = []
+
+    def frame(self):
+        return records_frame(self.records)
+
+
+def records_frame(records):
+    columns = ["name", "kind", "depth", "wall_s", "cpu_s", "peak_mb", "input_shape", "output_shape"]
+    return pd.DataFrame(records, columns=columns + ["timestamp"])[columns]
+
+
+def current_recorder():
+    return getattr(_local, "recorder", None)
+
+
+# tracemalloc actif pendant le bloc. Compteur d'utilisateurs partage par les threads :
+# le dernier sorti l'arrete (sauf s'il etait deja lance par ailleurs, ex. benchmark.py).
+@contextmanager
+def tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+    try:
+        yield
+    finally:
+        with _tracing_lock:
+            _tracing_users -= 1
+            if _tracing_users == 0 and _tracing_started:
+                tracemalloc.stop()
+                _tracing_started = False
+
+
+# Active l'enregistrement pour le thread courant ; tracemalloc n'est lance que si besoin
+@contextmanager
+def recording(recorder):
+    previous = current_recorder()
+    _local.recorder = recorder
+    try:
+        if recorder is None:
+            yield recorder
+        else:
+            with tracing():
+                yield recorder
+    finally:
+        _local.recorder = previous
+
+
+def _shape(value):
+    shape = getattr(value, "shape", None)
+    if shape is None and isinstance(value, tuple) and value:
+        shape = getattr(value[0], "shape", None)
+    return list(shape) if shape is not None else None
+
+
+# Mesure d'un bloc (etape d'affichage, ...). Les appels imbriques gardent une memoire de
+# pointe correcte : avant de remettre le pic a zero, le pic courant est reporte sur le parent.
+# Une autre session peut remettre le pic a zero ou liberer de la memoire pendant la mesure :
+# le pic est alors sous-estime (jamais negatif).
+@contextmanager
+def measure(name, kind="ui", input_shape=None):
+    recorder = current_recorder()
+    if recorder is None:
+        yield None
+        return
+
+    current, peak = tracemalloc.get_traced_memory()
+    if recorder._stack:
+        recorder._stack[-1]["peak"] = max(recorder._stack[-1]["peak"], peak)
+    tracemalloc.reset_peak()
+    frame = {"start_memory": current, "peak": current, "output_shape": None}
+    recorder._stack.append(frame)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield frame
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+        recorder._stack.pop()
+        peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+        if recorder._stack:
+            recorder._stack[-1]["peak"] = max(recorder._stack[-1]["peak"], peak)
+        recorder.add({
+            "name": name,
+            "kind": kind,
+            "depth": len(recorder._stack),
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "peak_mb": max(0, peak - frame["start_memory"]) / 2**20,
+            "input_shape": input_shape,
+            "output_shape": frame["output_shape"],
+            "timestamp": time.time(),
+        })
+
+
+# Decorateur : mesure chaque appel quand un enregistrement est actif
+def instrument(func=None, name=None):
+    if func is None:
+        return functools.partial(instrument, name=name)
+    label = name or f"{func.__module__}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, "recorder", None) is None:
+            return func(*args, **kwargs)
+        with measure(label, "operation", _shape(args[0]) if args else None) as frame:
+            result = func(*args, **kwargs)
+            frame["output_shape"] = _shape(result)
+        return result
+
+    return wrapper
@@ -1,29 +1,24 @@
 import streamlit as st
-from part1 import central_tendency, quantiles, missing_unique
-import seaborn as sns
+from part1 import draw_boxplot, draw_histogram, draw_scatter, draw_heatmap
+from correlation import pair_columns, top_k_pairs
+from history import DataHistory, DEFAULT_MEMORY_BUDGET_MB
+from loader import DATASET_CACHE, csv_columns, load_dataset, memory_summary
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 from shapely.geometry import Point
 from pathlib import Path
 
-# Utilisation de cache pour charger les données plus rapidement
-@st.cache_data
-def load_data(uploaded_file):
-    data = pd.read_csv(uploaded_file)
-
-    # 64 vers 32 pour charger notre data plus rapidement
-    for col in data.select_dtypes(include=["float64"]).columns:
-        data[col] = data[col].astype("float32")
-    for col in data.select_dtypes(include=["int64"]).columns:
-        data[col] = data[col].astype("int32")
-    return data
-
 def main():
     st.title("Projet Data Mining")
-    # Historique pour annuler les opérations
+    # Historique pour annuler les opérations (journal des opérations + checkpoints)
     if "data_history" not in st.session_state:
-        st.session_state["data_history"] = []
+        st.session_state["data_history"] = DataHistory()
+    history = st.session_state["data_history"]
+    history.memory_budget_mb = st.sidebar.number_input(
+        "Budget mémoire de l'historique (Mo)", min_value=16, value=DEFAULT_MEMORY_BUDGET_MB, step=16,
+        key="history_budget_mb"
+    )
 
 
 
@@ -34,15 +29,18 @@ def main():
 
     # Utilisation de st.session state pour charger les données 1 seule fois
     if uploaded_file:
-        if not st.session_state["data_history"]:
-            data = load_data(uploaded_file)
-            st.session_state["data_history"].append(data)
-            st.success("Données chargées avec succès.")
+        if not history:
+            usecols = st.multiselect("Colonnes à charger (toutes si vide)", csv_columns(uploaded_file))
+            if st.button("Charger les données"):
+                data, report = load_dataset(uploaded_file, usecols or None)
+                history.load(data)
+                st.success("Données chargées avec succès.")
+                st.caption(memory_summary(report))
 
     # Vérifier si des données sont disponibles dans session_state
-    if st.session_state["data_history"]:
+    if history:
 
-        data = st.session_state["data_history"][-1]
+        data = history.current
 
         st.subheader("Aperçu des Données")
         st.dataframe(data.head(100))
@@ -52,9 +50,9 @@ def main():
             st.session_state["rerun_counter"] = 0
 
         # Annuler la dernière opération
-        if len(st.session_state["data_history"]) >= 1:
+        if len(history) >= 1:
             if st.button("Annuler la dernière opération"):
-                st.session_state["data_history"].pop()
+                history.pop()
                 st.session_state["rerun_counter"] += 1
                 st.experimental_set_query_params(rerun=st.session_state["rerun_counter"])
 
@@ -83,9 +81,7 @@ def main():
                     new_value = st.text_input("Nouvelle valeur")
 
                     if st.button("Appliquer la modification"):
-                        for row_idx in selected_rows:
-                            data.at[row_idx, col_name] = new_value
-                        st.session_state["data_history"].append(data.copy())
+                        data = history.apply("set_values", rows=selected_rows, col=col_name, value=new_value)
                         st.success(f"Valeurs modifiées dans la colonne '{col_name}' pour les indices {selected_rows}.")
                         st.dataframe(data.head(100))
 
@@ -93,8 +89,7 @@ def main():
                     selected_rows = st.multiselect("Choisir les indices des lignes à supprimer", options=data.index.tolist())
 
                     if st.button("Supprimer les lignes"):
-                        data = data.drop(index=selected_rows).reset_index(drop=True)
-                        st.session_state["data_history"].append(data.copy())
+                        data = history.apply("drop_rows", rows=selected_rows)
                         st.success(f"Lignes {selected_rows} supprimées.")
                         st.dataframe(data.head(100))
 
@@ -111,8 +106,7 @@ def main():
                     if st.button("Appliquer les nouveaux noms"):
                         new_col_names = [name.strip() for name in new_col_names.split(",")]
                         if len(selected_cols) == len(new_col_names):
-                            data = data.rename(columns=dict(zip(selected_cols, new_col_names)))
-                            st.session_state["data_history"].append(data.copy())
+                            data = history.apply("rename_columns", mapping=dict(zip(selected_cols, new_col_names)))
                             st.success(f"Colonnes renommées avec succès : {dict(zip(selected_cols, new_col_names))}.")
                             st.dataframe(data.head(100))
                         else:
@@ -122,8 +116,7 @@ def main():
                     selected_cols = st.multiselect("Choisir les colonnes à supprimer", options=data.columns.tolist(), key="col_name_supprimer")
 
                     if st.button("Supprimer les colonnes"):
-                        data = data.drop(columns=selected_cols).reset_index(drop=True)
-                        st.session_state["data_history"].append(data.copy())
+                        data = history.apply("drop_columns", cols=selected_cols)
                         st.success(f"Colonnes supprimées : {selected_cols}.")
                         st.dataframe(data.head(100))
 
@@ -131,41 +124,44 @@ def main():
 
 
     # === Partie 2 : Description globale ===
-    if st.session_state["data_history"]:
+    if history:
         st.header("2. Description Globale du Dataset")
         if st.checkbox("Afficher la description globale du dataset"):
             st.write(f"**Dimensions**: {data.shape[0]} lignes, {data.shape[1]} colonnes")
             st.subheader("Statistiques Descriptives")
-            st.write(data.describe())
+            # Profil de toutes les colonnes numériques en une seule passe
+            profile_table, timings = history.stat("profile")
+            st.dataframe(profile_table)
+            st.caption(f"Profil calculé en {timings['total'] * 1000:.0f} ms")
             
             st.subheader("Valeurs Manquantes")
-            missing_values = data.isnull().sum()
+            missing_values = history.stat("missing")
             st.write("Nombre de valeurs manquantes par colonne :")
             st.dataframe(missing_values[missing_values >= 0])
             
             st.subheader("Valeurs Uniques")
-            unique_values = data.nunique()
+            unique_values = history.stat("nunique")
             st.write("Nombre de valeurs uniques par colonne :")
             st.dataframe(unique_values)
 
 
 
     # === Partie 3 : Analyse des Attributs ===
-    if st.session_state["data_history"]:
+    if history:
         st.header("3. Analyse des Attributs")
         
-        selected_col = st.selectbox("Choisir une colonne numérique pour l'analyse", data.select_dtypes(include=[float, int]).columns)
+        selected_col = st.selectbox("Choisir une colonne numérique pour l'analyse", history.stat("numeric_columns"))
 
         # Infos générales
         if st.checkbox("Afficher les infos générales"):
             st.markdown("### **Infos Générales sur la Colonne**")
             col1, col2 = st.columns(2)
 
-            # Calcul des statistiques générales
-            std_dev = data[selected_col].std()
-            variance = data[selected_col].var()
-            missing_values = data[selected_col].isnull().sum()
-            unique_values = data[selected_col].nunique()
+            # Statistiques générales (calculées une fois par version du dataset)
+            std_dev = history.stat("std", selected_col)
+            variance = history.stat("var", selected_col)
+            missing_values = history.stat("missing", selected_col)
+            unique_values = history.stat("nunique", selected_col)
 
             # Affichage
             with col1:
@@ -176,7 +172,7 @@ def main():
                 st.metric(label="Valeurs uniques", value=f"{unique_values}")
 
             st.markdown("### **Mesures de Tendance Centrale**")
-            mean, median, mode, symetric = central_tendency(data, selected_col)
+            mean, median, mode, symetric = history.stat("central_tendency", selected_col)
 
             if isinstance(mode, pd.Series) or isinstance(mode, list):
                 mode_value = ", ".join([f"{m:.2f}" for m in mode])
@@ -198,7 +194,7 @@ def main():
             st.markdown("### **Mesures de Dispersion et Outliers**")
 
             # Calcul des quantiles et des bornes
-            q, lower, upper, quantile_att = quantiles(data, selected_col)
+            q, lower, upper, quantile_att = history.stat("quantiles", selected_col)
 
             # Vérification et formatage des quantiles si c'est une liste ou une série
             if isinstance(q, (pd.Series, list, np.ndarray)):
@@ -237,36 +233,64 @@ def main():
         # Visualisations
         st.subheader("Visualisations")
         if st.checkbox("Afficher le Boxplot"):
+            # Au-delà de AGGREGATE_THRESHOLD lignes : boxplot à partir des quartiles
             fig, ax = plt.subplots()
-            sns.boxplot(y=data[selected_col], ax=ax)
+            draw_boxplot(ax, data[selected_col])
             st.pyplot(fig)
             
         if st.checkbox("Afficher l'Histogramme"):
             fig, ax = plt.subplots()
-            sns.histplot(data[selected_col], kde=True, bins=10, color='skyblue', edgecolor='black', ax=ax)
+            draw_histogram(ax, data[selected_col], bins=10, kde=True)
             ax.set_title(f"Histogramme de {selected_col}")
             st.pyplot(fig)
 
 
 
     # === Partie 4 : Analyse entre Attributs ===
-    if st.session_state["data_history"]:
+    if history:
         st.header("4. Analyse entre Attributs")
 
         # Sélectionner 2 colonnes pour l'analyse
         st.subheader("Corrélations entre deux attributs")
         if st.checkbox("Afficher la corrélation entre 2 attributs"):
-            col1 = st.selectbox("Choisir la première colonne", data.select_dtypes(include=[float, int]).columns, key="col1")
-            col2 = st.selectbox("Choisir la deuxième colonne", data.select_dtypes(include=[float, int]).columns, key="col2")
+            col1 = st.selectbox("Choisir la première colonne", history.stat("numeric_columns"), key="col1")
+            col2 = st.selectbox("Choisir la deuxième colonne", history.stat("numeric_columns"), key="col2")
             if col1 == col2:
                 st.error("Erreur : Colonnes identiques, veuillez choisir 2 colonnes différentes")
             else:
                 if st.button("Afficher le Scatter Plot"):
                     fig, ax = plt.subplots()
-                    sns.scatterplot(x=data[col1], y=data[col2], ax=ax)
+                    # Carte de densité (histogramme 2-D) au-delà de AGGREGATE_THRESHOLD lignes
+                    draw_scatter(ax, data[col1], data[col2])
+                    ax.set_xlabel(col1)
+                    ax.set_ylabel(col2)
                     ax.set_title(f"Corrélation entre {col1} et {col2}")
                     st.pyplot(fig)
 
+        # Paires les plus corrélées sur toutes les colonnes numériques
+        st.subheader("Paires les plus corrélées")
+        if st.checkbox("Afficher les paires les plus corrélées"):
+            method = st.radio("Méthode", ["pearson", "spearman"], horizontal=True)
+            k = st.slider("Nombre de paires", 1, 50, 10)
+            threshold = st.slider("Seuil (|corrélation|)", 0.0, 1.0, 0.5, 0.05)
+            pairs = top_k_pairs(history.stat(method), k, threshold)
+            if pairs.empty:
+                st.info("Aucune paire au-dessus du seuil.")
+            else:
+                st.dataframe(pairs)
+                # Heatmap limitée aux colonnes des paires retenues
+                fig, ax = plt.subplots()
+                draw_heatmap(ax, history.stat(method), pair_columns(pairs))
+                ax.set_title(f"Corrélation ({method})")
+                st.pyplot(fig)
+
+    # Mémoire occupée par l'historique
+    if history:
+        st.sidebar.caption(f"Historique : {len(history)} versions, {history.memory_usage() / 2**20:.1f} Mo")
+        cache = DATASET_CACHE.stats()
+        st.sidebar.caption(f"Cache disque : {cache['entries']} fichiers, {cache['size_mb']:.0f} Mo, "
+                           f"{cache['hits']} succès / {cache['misses']} échecs")
+
 # Lancer l'application
 if __name__ == "__main__":
     main()
@@ -1,51 +1,78 @@
-from matplotlib import pyplot as plt
+import os
 import streamlit as st
-import pandas as pd
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-from matplotlib.cm import ScalarMappable
-from matplotlib.colors import Normalize
-from part2 import (
-    outlier,
-    normalize_data,
-    discretization,
-    eliminate_redundancies,
-    aggregate_by_season,
-)
-
-# Chargement de données avec cache
-@st.cache_data
-def load_data(uploaded_file):
-    data = pd.read_csv(uploaded_file)
-    # 64 vers 32
-    for col in data.select_dtypes(include=["float64"]).columns:
-        data[col] = data[col].astype("float32")
-    for col in data.select_dtypes(include=["int64"]).columns:
-        data[col] = data[col].astype("int32")
-    return data
+from history import DataHistory, DEFAULT_MEMORY_BUDGET_MB
+from loader import DATASET_CACHE, csv_columns, load_dataset, memory_summary
+from maps import intensity_map
+from instrumentation import Recorder, measure, recording
+
+DIAGNOSTICS_LOG = "diagnostics.jsonl"
+
+
+# Affichage d'un aperçu, mesuré dans le panneau de diagnostics
+def show_dataframe(df, rows=500):
+    with measure("st.dataframe", input_shape=list(df.shape)):
+        st.dataframe(df.head(rows))
+
+
+# Panneau de diagnostics : temps réel / CPU, mémoire de pointe et dimensions par opération
+def diagnostics_panel(recorder):
+    with st.expander("Diagnostics (temps et mémoire)"):
+        frame = recorder.frame()
+        if frame.empty:
+            st.info("Aucune opération mesurée.")
+        else:
+            st.dataframe(frame.iloc[::-1])
+        if st.button("Effacer les mesures"):
+            recorder.clear()
 
 # === Fonction principale ===
 def main():
+    recorder = None
+    if st.sidebar.checkbox("Diagnostics (temps / mémoire)", key="diagnostics"):
+        recorder = st.session_state.setdefault("diagnostics_recorder", Recorder())
+        log = st.sidebar.checkbox(f"Journaliser dans {DIAGNOSTICS_LOG}", key="diagnostics_log")
+        recorder.log_path = DIAGNOSTICS_LOG if log else None
+    # Sans diagnostics, les fonctions instrumentées ne font qu'un test
+    with recording(recorder):
+        page()
+    if recorder is not None:
+        diagnostics_panel(recorder)
+
+
+def page():
     st.title("Partie 2 : Prétraitement Avancé")
 
     uploaded_file = st.file_uploader("Importer le fichier", type=["csv"])
     if uploaded_file:
-        if "data_history" not in st.session_state:
-            st.session_state["data_history"] = [] 
-            data = load_data(uploaded_file)
-            st.session_state["data_history"].append(data)
-            st.success("Données chargées avec succès.")
+        if not st.session_state.get("data_history"):
+            usecols = st.multiselect("Colonnes à charger (toutes si vide)", csv_columns(uploaded_file))
+            if st.button("Charger les données"):
+                data, report = load_dataset(uploaded_file, usecols or None)
+                st.session_state["data_history"] = DataHistory(data)
+                st.success("Données chargées avec succès.")
+                st.caption(memory_summary(report))
 
     # Vérification des données dans l'historique
     if "data_history" in st.session_state and st.session_state["data_history"]:
-        data = st.session_state["data_history"][-1]
+        history = st.session_state["data_history"]
+        history.memory_budget_mb = st.sidebar.number_input(
+            "Budget mémoire de l'historique (Mo)", min_value=16, value=DEFAULT_MEMORY_BUDGET_MB, step=16,
+            key="history_budget_mb"
+        )
+        # Opérations par colonnes réparties sur plusieurs processus (gros jeux de données)
+        n_jobs = st.sidebar.number_input(
+            "Processus pour les traitements par colonnes", min_value=1, max_value=os.cpu_count() or 1, value=1,
+            key="n_jobs"
+        )
+        jobs = {"n_jobs": n_jobs} if n_jobs > 1 else {}
+        data = history.current
         st.write(f"**Dimensions des données :** {data.shape[0]} lignes, {data.shape[1]} colonnes")
-        st.dataframe(data.head(500))
+        show_dataframe(data, 500)
 
         # Annuler la dernière opération
         if st.button("Annuler la dernière opération"):
-            if len(st.session_state["data_history"]) > 1:
-                st.session_state["data_history"].pop()
+            if len(history) > 1:
+                history.pop()
                 st.success("Dernière opération annulée.")
             else:
                 st.warning("Aucune opération à annuler.")
@@ -54,24 +81,22 @@ def main():
         st.header("Réduction des données par aggrégation saisonnière")
         if st.checkbox("Réduction des données par agrégation saisonnière"):
             if st.button("Appliquer l'agrégation par saisons"):
-                aggregated_data = aggregate_by_season(data)
-                st.session_state["data_history"].append(aggregated_data)
+                aggregated_data = history.apply("aggregate_by_season")
                 st.success("Agrégation par saisons appliquée.")
                 st.write(f"**Dimensions après agrégation :** {aggregated_data.shape[0]} lignes, {aggregated_data.shape[1]} colonnes")
-                st.dataframe(aggregated_data.head(500))
+                show_dataframe(aggregated_data, 500)
 
         # Gestion des valeurs aberrantes
         st.header("Gestion des Outliers")
         if st.checkbox("Gestion des Outliers"):
             st.markdown("### Gestion des Outliers")
             outlier_method = st.selectbox("Méthode pour traiter les outliers", ["zscore", "IQR", "Clipping", "log"])
-            selected_cols = st.multiselect("Colonnes à traiter", data.select_dtypes(include=[float, int]).columns)
+            selected_cols = st.multiselect("Colonnes à traiter", history.stat("numeric_columns"))
 
             if st.button("Appliquer la gestion des outliers"):
-                outlier_data = outlier(data, method=outlier_method, cols=selected_cols)
-                st.session_state["data_history"].append(outlier_data)
+                outlier_data = history.apply("outlier", method=outlier_method, cols=selected_cols, **jobs)
                 st.success("Gestion des outliers appliquée.")
-                st.dataframe(outlier_data.head(500))
+                show_dataframe(outlier_data, 500)
 
         # Gestion des valeurs manquantes
         st.header("Gestion des valeurs manquantes")
@@ -90,69 +115,60 @@ def main():
             )
             selected_cols = st.multiselect("Colonnes à traiter", data.columns)
 
-            updated_data = data.copy()
+            updated_data = data
 
             # Calcul des valeurs manquantes
-            initial_missing = updated_data[selected_cols].isnull().sum().sum()
+            initial_missing = history.stat("missing")[selected_cols].sum()
 
             if missing_option == "Remplir avec une constante":
                 constant_value = st.text_input("Valeur constante pour remplacement")
                 if st.button("Appliquer"):
                     if constant_value:
-                        updated_data[selected_cols] = updated_data[selected_cols].fillna(constant_value)
-                        st.session_state["data_history"].append(updated_data)
+                        updated_data = history.apply("fill_missing", cols=selected_cols, strategy="constant", value=constant_value, **jobs)
                         treated_count = initial_missing - updated_data[selected_cols].isnull().sum().sum()
                         st.success(f"Valeurs manquantes remplacées par {constant_value}. Total traité : {treated_count}.")
             elif missing_option == "Remplir avec la moyenne":
                 if st.button("Appliquer"):
-                    updated_data[selected_cols] = updated_data[selected_cols].fillna(updated_data[selected_cols].mean())
-                    st.session_state["data_history"].append(updated_data)
+                    updated_data = history.apply("fill_missing", cols=selected_cols, strategy="mean", **jobs)
                     treated_count = initial_missing - updated_data[selected_cols].isnull().sum().sum()
                     st.success(f"Valeurs manquantes remplacées par la moyenne. Total traité : {treated_count}.")
             elif missing_option == "Remplir avec la médiane":
                 if st.button("Appliquer"):
-                    updated_data[selected_cols] = updated_data[selected_cols].fillna(updated_data[selected_cols].median())
-                    st.session_state["data_history"].append(updated_data)
+                    updated_data = history.apply("fill_missing", cols=selected_cols, strategy="median", **jobs)
                     treated_count = initial_missing - updated_data[selected_cols].isnull().sum().sum()
                     st.success(f"Valeurs manquantes remplacées par la médiane. Total traité : {treated_count}.")
             elif missing_option == "Remplir avec le mode":
                 if st.button("Appliquer"):
-                    for col in selected_cols:
-                        mode_value = updated_data[col].mode()[0]
-                        updated_data[col] = updated_data[col].fillna(mode_value)
-                    st.session_state["data_history"].append(updated_data)
+                    updated_data = history.apply("fill_missing", cols=selected_cols, strategy="mode")
                     treated_count = initial_missing - updated_data[selected_cols].isnull().sum().sum()
                     st.success(f"Valeurs manquantes remplacées par le mode. Total traité : {treated_count}.")
             elif missing_option == "Supprimer les lignes avec des valeurs manquantes":
                 if st.button("Appliquer"):
-                    initial_rows = updated_data.shape[0]
-                    updated_data = updated_data.dropna()
-                    st.session_state["data_history"].append(updated_data)
+                    initial_rows = data.shape[0]
+                    updated_data = history.apply("fill_missing", cols=selected_cols, strategy="drop_rows")
                     removed_rows = initial_rows - updated_data.shape[0]
                     st.success(f"Lignes supprimées. Total de lignes supprimées : {removed_rows}.")
             elif missing_option == "Supprimer les colonnes avec des valeurs manquantes":
                 if st.button("Appliquer"):
-                    initial_cols = updated_data.shape[1]
-                    updated_data = updated_data.dropna(axis=1)
-                    st.session_state["data_history"].append(updated_data)
+                    initial_cols = data.shape[1]
+                    updated_data = history.apply("fill_missing", cols=selected_cols, strategy="drop_columns")
                     removed_cols = initial_cols - updated_data.shape[1]
                     st.success(f"Colonnes supprimées. Total de colonnes supprimées : {removed_cols}.")
 
             # Affichage du dataframe mis à jour
-            st.dataframe(updated_data.head(500))
+            show_dataframe(updated_data, 500)
 
         # Normalisation
         st.header("Normalisation des données")
         if st.checkbox("Normalisation des données"):
             st.markdown("### Normalisation")
             norm_method = st.radio("Méthode de normalisation", ["minmax", "zscore"])
-            selected_cols = st.multiselect("Colonnes à normaliser", data.select_dtypes(include=[float, int]).columns)
+            selected_cols = st.multiselect("Colonnes à normaliser", history.stat("numeric_columns"))
 
             if st.button("Appliquer la normalisation"):
-                normalized_data = normalize_data(data, method=norm_method, cols=selected_cols)
-                st.session_state["data_history"].append(normalized_data)
+                normalized_data = history.apply("normalize_data", method=norm_method, cols=selected_cols, **jobs)
                 st.success("Normalisation appliquée.")
-                st.dataframe(normalized_data.head(500))
+                show_dataframe(normalized_data, 500)
 
         # Discrétisation
         st.header("Discrétisation des données")
@@ -160,25 +176,34 @@ def main():
             st.markdown("### Discrétisation")
             disc_method = st.radio("Méthode de discrétisation", ["equal_frequency", "equal_width"])
             num_bins = st.slider("Nombre de bins", min_value=2, max_value=10, value=5)
-            selected_cols = st.multiselect("Colonnes à discrétiser", data.select_dtypes(include=[float, int]).columns)
+            selected_cols = st.multiselect("Colonnes à discrétiser", history.stat("numeric_columns"))
+            codes = st.checkbox("Codes entiers (uint8) au lieu de catégories")
 
             if st.button("Appliquer la discrétisation"):
-                discretized_data = discretization(data, cols=selected_cols, num_bins=num_bins, method=disc_method)
-                st.session_state["data_history"].append(discretized_data)
+                discretized_data = history.apply("discretization", cols=selected_cols, num_bins=num_bins, method=disc_method, codes=codes, **jobs)
                 st.success("Discrétisation appliquée.")
-                st.dataframe(discretized_data.head(500))
+                show_dataframe(discretized_data, 500)
 
         # Réduction des redondances
         st.header("Réduction des redondances")
         if st.checkbox("Réduction des Redondances"):
             st.markdown("### Réduction des Redondances")
             red_method = st.radio("Méthode", ["horizontal", "vertical"])
+            threshold = None
+            tolerance = None
+            if red_method == "vertical" and st.checkbox("Supprimer aussi les colonnes très corrélées"):
+                threshold = st.slider("Seuil de corrélation (valeur absolue)", 0.80, 1.0, 0.99, 0.01)
+            if red_method == "horizontal":
+                tolerance = st.number_input("Tolérance sur les valeurs numériques (0 = égalité exacte)", min_value=0.0, value=0.0, format="%g") or None
 
             if st.button("Appliquer la réduction des redondances"):
-                reduced_data = eliminate_redundancies(data, method=red_method)
-                st.session_state["data_history"].append(reduced_data)
+                before = list(data.columns)
+                reduced_data = history.apply("eliminate_redundancies", method=red_method, threshold=threshold, tolerance=tolerance)
                 st.success("Réduction des redondances appliquée.")
-                st.dataframe(reduced_data.head(100))
+                dropped = [col for col in before if col not in reduced_data.columns]
+                if dropped:
+                    st.write("Colonnes supprimées :", ", ".join(map(str, dropped)))
+                show_dataframe(reduced_data, 100)
 
         # Téléchargement des données traitées
         st.header("Télécharger les données traitées")
@@ -192,13 +217,13 @@ def main():
         
 
         # Vérification si des données sont chargées
-        if st.session_state["data_history"] and not st.session_state["data_history"][-1].empty:
+        if history and not history.current.empty:
             # Checkbox pour afficher la carte
             if st.checkbox("Afficher Carte"):
                 st.header("Carte d'Intensité Basée sur les Propriétés")
 
                 # Récupération des données actuelles
-                map_df = st.session_state["data_history"][-1]
+                map_df = history.current
 
                 # Choix du type de propriété
                 prop_type = st.radio("Sélectionner le type de propriété :", ["Propriétés du Sol", "Propriétés Climatiques"])
@@ -224,42 +249,31 @@ def main():
                     ["Reds", "Blues", "Greens"]
                 )
 
-                # Extraction des latitudes, longitudes et intensité en fonction de la propriété sélectionnée
+                # Carte mise en cache par version du dataset, propriété, saison et palette
                 try:
-                    lats = map_df["lat"].values  # Coordonnées de latitude
-                    longs = map_df["lon"].values  # Coordonnées de longitude
-                    intensity = map_df[f"{prop}_{season_prop}" if prop_type == "Propriétés Climatiques" else prop].values
-
-                    # Création de la carte avec Cartopy
-                    fig, ax = plt.subplots(figsize=(8, 8))
-                    ax = plt.axes(projection=ccrs.PlateCarree())
-                    ax.set_extent([-10, 12, 18, 38])  # Délimitation pour l'Algérie
-
-                    # Ajout des éléments de la carte
-                    ax.add_feature(cfeature.COASTLINE)
-                    ax.add_feature(cfeature.BORDERS, linestyle=':')
-                    ax.add_feature(cfeature.LAKES, alpha=0.4)
-
-                    # Normalisation des valeurs pour la palette
-                    norm = Normalize(vmin=min(intensity), vmax=max(intensity))
-                    cmap = plt.get_cmap(color_palette)
-
-                    # Tracer les points d'intensité
-                    scatter = ax.scatter(
-                        longs, lats, c=intensity, cmap=cmap, norm=norm, s=30, alpha=0.8, edgecolor='none'
+                    column = f"{prop}_{season_prop}" if prop_type == "Propriétés Climatiques" else prop
+                    png = intensity_map(
+                        (history.fingerprint, column, season_prop, color_palette),
+                        map_df,
+                        column,
+                        f"Carte d'Intensité de {prop} en Algérie ({season_prop})",
+                        color_palette,
                     )
 
-                    # Barre de couleur pour représenter l'intensité
-                    cbar = plt.colorbar(ScalarMappable(norm=norm, cmap=cmap), ax=ax, orientation="vertical", label="Intensité")
-
-                    # Titre de la carte
-                    plt.title(f"Carte d'Intensité de {prop} en Algérie ({season_prop})")
-
                     # Afficher la carte dans Streamlit
-                    st.pyplot(fig)
+                    with measure("st.image (carte)"):
+                        st.image(png)
 
                 except KeyError:
                     st.error("Les colonnes nécessaires (lat, lon, ou propriétés) ne sont pas présentes dans le dataset.")
+                except (ValueError, MemoryError) as e:
+                    st.error(f"Impossible de tracer la carte : {e}")
+
+        # Mémoire occupée par l'historique
+        st.sidebar.caption(f"Historique : {len(history)} versions, {history.memory_usage() / 2**20:.1f} Mo")
+        cache = DATASET_CACHE.stats()
+        st.sidebar.caption(f"Cache disque : {cache['entries']} fichiers, {cache['size_mb']:.0f} Mo, "
+                           f"{cache['hits']} succès / {cache['misses']} échecs")
 
 
 
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from dataset_cache import DatasetCache, content_key
+from instrumentation import instrument
+
+# Chargement CSV commun aux deux pages Streamlit : les types sont choisis pendant la lecture
+# (float32, categories pour les chaines peu variees) d'apres un echantillon des premieres
+# lignes, puis les entiers sont reduits au plus petit type qui contient leurs valeurs.
+
+SAMPLE_ROWS = 50_000
+# Chaine -> category si (valeurs distinctes / lignes) de l'echantillon est sous ce ratio
+CATEGORY_MAX_RATIO = 0.05
+
+# Cache disque commun (toutes les sessions et tous les processus du serveur)
+DATASET_CACHE = DatasetCache()
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def csv_columns(source):
+    columns = pd.read_csv(_rewind(source), nrows=0).columns.tolist()
+    _rewind(source)
+    return columns
+
+
+def frame_memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+# Types a appliquer pendant la lecture, deduits de l'echantillon
+def _parse_dtypes(sample):
+    dtypes = {}
+    for col in sample.columns:
+        values = sample[col]
+        if pd.api.types.is_float_dtype(values):
+            dtypes[col] = "float32"
+        elif (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)) and len(values):
+            if values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+                dtypes[col] = "category"
+    return dtypes
+
+
+def downcast_integers(df):
+    for col in df.select_dtypes(include=["integer"]).columns:
+        df[col] = pd.to_numeric(df[col], downcast="unsigned" if df[col].min() >= 0 else "integer")
+    return df
+
+
+# Lecture d'un CSV (chemin ou fichier importe) avec types compacts.
+# usecols : colonnes a garder ; use_arrow : lecture par pyarrow et colonnes Arrow.
+# Retourne (data, report) ; report compare la memoire obtenue a une estimation de la
+# memoire avec les types par defaut de pandas (mesuree sur l'echantillon).
+@instrument
+def read_dataset(source, usecols=None, use_arrow=False):
+    sample = pd.read_csv(_rewind(source), usecols=usecols, nrows=SAMPLE_ROWS)
+    default_row_bytes = sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+
+    if use_arrow:
+        data = pd.read_csv(_rewind(source), usecols=usecols, engine="pyarrow", dtype_backend="pyarrow")
+    else:
+        try:
+            data = pd.read_csv(_rewind(source), usecols=usecols, dtype=_parse_dtypes(sample))
+        except (ValueError, TypeError):
+            # Types de l'echantillon non valables plus loin dans le fichier
+            data = pd.read_csv(_rewind(source), usecols=usecols)
+            for col in data.select_dtypes(include=["float64"]).columns:
+                data[col] = data[col].astype("float32")
+        data = downcast_integers(data)
+    _rewind(source)
+
+    report = {
+        "rows": len(data),
+        "columns": data.shape[1],
+        "memory_mb": frame_memory_mb(data),
+        "default_memory_mb": default_row_bytes * len(data) / 2**20,
+        "dtypes": data.dtypes.astype(str).value_counts().to_dict(),
+    }
+    report["ratio"] = report["default_memory_mb"] / report["memory_mb"] if report["memory_mb"] else np.nan
+    return data, report
+
+
+# read_dataset avec le cache disque : un meme contenu (memes options) n'est parse qu'une fois
+@instrument
+def load_dataset(source, usecols=None, use_arrow=False, cache=DATASET_CACHE):
+    if cache is None or not cache.enabled:
+        return read_dataset(source, usecols, use_arrow)
+    key = content_key(_rewind(source), sorted(usecols) if usecols else None, use_arrow)
+    cached = cache.get(key)
+    if cached is not None:
+        data, report = cached
+        report["cache"] = "hit"
+        return data, report
+    data, report = read_dataset(source, usecols, use_arrow)
+    cache.put(key, data, report)
+    report["cache"] = "miss"
+    return data, report
+
+
+def memory_summary(report):
+    return (f"{report['rows']} lignes, {report['columns']} colonnes : {report['memory_mb']:.1f} Mo en mémoire "
+            f"(≈ {report['default_memory_mb']:.1f} Mo avec les types par défaut, x{report['ratio']:.1f})"
+            + (" — lu depuis le cache disque" if report.get("cache") == "hit" else ""))
@@ -0,0 +1,119 @@
+import io
+import threading
+from collections import OrderedDict
+
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+
+from instrumentation import instrument
+
+# Délimitation pour l'Algérie [lon min, lon max, lat min, lat max]
+EXTENT = [-10, 12, 18, 38]
+MAX_CACHED_MAPS = 64
+# Au-dela de ce nombre de cellules (ou si les points ne sont pas sur une grille reguliere),
+# la carte est tracee point par point au lieu d'une image
+MAX_RASTER_CELLS = 4_000_000
+# Ecart toleré a la grille, en fraction du pas
+GRID_TOLERANCE = 1e-3
+
+# Objets Figure indépendants (pas d'état global pyplot) : sûr avec plusieurs sessions
+_lock = threading.Lock()
+_base_layer = None
+_maps = OrderedDict()
+
+
+# Fond de carte (côtes, frontières, lacs) rendu une seule fois en image RGBA transparente
+def base_layer(dpi=150):
+    global _base_layer
+    with _lock:
+        if _base_layer is None:
+            width, height = EXTENT[1] - EXTENT[0], EXTENT[3] - EXTENT[2]
+            fig = Figure(figsize=(8 * width / height, 8), dpi=dpi)
+            canvas = FigureCanvasAgg(fig)
+            ax = fig.add_axes([0, 0, 1, 1], projection=ccrs.PlateCarree())
+            ax.set_extent(EXTENT, crs=ccrs.PlateCarree())
+            ax.add_feature(cfeature.COASTLINE)
+            ax.add_feature(cfeature.BORDERS, linestyle=':')
+            ax.add_feature(cfeature.LAKES, alpha=0.4)
+            ax.set_axis_off()
+            fig.patch.set_alpha(0)
+            ax.patch.set_alpha(0)
+            canvas.draw()
+            _base_layer = np.asarray(canvas.buffer_rgba()).copy()
+        return _base_layer
+
+
+# Points d'une grille régulière lon/lat -> (tableau 2-D avec NaN hors des points fournis, emprise).
+# None si les points ne sont pas sur une grille régulière ou si le tableau serait trop grand.
+def grid_raster(lons, lats, values, max_cells=MAX_RASTER_CELLS):
+    lons = np.asarray(lons, dtype="float64")
+    lats = np.asarray(lats, dtype="float64")
+    steps = []
+    for coords in (lons, lats):
+        diffs = np.diff(np.unique(coords))
+        steps.append(diffs.min() if diffs.size else 0.5)
+    lon_step, lat_step = steps
+    lon0, lat0 = lons.min(), lats.min()
+    x, y = (lons - lon0) / lon_step, (lats - lat0) / lat_step
+    ix, iy = np.rint(x), np.rint(y)
+    if np.abs(x - ix).max() > GRID_TOLERANCE or np.abs(y - iy).max() > GRID_TOLERANCE:
+        return None
+    if (ix.max() + 1) * (iy.max() + 1) > max_cells:
+        return None
+    ix, iy = ix.astype(int), iy.astype(int)
+    grid = np.full((iy.max() + 1, ix.max() + 1), np.nan)
+    grid[iy, ix] = values
+    extent = [lon0 - lon_step / 2, lon0 + (ix.max() + 0.5) * lon_step,
+              lat0 - lat_step / 2, lat0 + (iy.max() + 0.5) * lat_step]
+    return grid, extent
+
+
+@instrument
+def render_map(lons, lats, values, title, palette):
+    values = np.asarray(values, dtype="float64")
+    raster = grid_raster(lons, lats, values)
+
+    fig = Figure(figsize=(8, 8))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    norm = Normalize(vmin=np.nanmin(values), vmax=np.nanmax(values))
+    cmap = matplotlib.colormaps[palette]
+
+    # Une seule image pour toute la grille (sinon les points), puis le fond de carte par-dessus
+    if raster is not None:
+        grid, extent = raster
+        ax.imshow(grid, origin="lower", extent=extent, cmap=cmap, norm=norm, alpha=0.8, interpolation="nearest")
+    else:
+        ax.scatter(lons, lats, c=values, cmap=cmap, norm=norm, alpha=0.8, s=4, marker="s", linewidths=0)
+    ax.imshow(base_layer(), extent=EXTENT, zorder=2)
+    ax.set_xlim(EXTENT[0], EXTENT[1])
+    ax.set_ylim(EXTENT[2], EXTENT[3])
+    ax.set_aspect("equal")
+    ax.set_xticks([])
+    ax.set_yticks([])
+    fig.colorbar(ScalarMappable(norm=norm, cmap=cmap), ax=ax, orientation="vertical", label="Intensité")
+    ax.set_title(title)
+
+    buffer = io.BytesIO()
+    canvas.print_png(buffer)
+    return buffer.getvalue()
+
+
+# Carte PNG mise en cache par clé (version du dataset, propriété, saison, palette)
+def intensity_map(key, map_df, column, title, palette):
+    with _lock:
+        if key in _maps:
+            _maps.move_to_end(key)
+            return _maps[key]
+    png = render_map(map_df["lon"].to_numpy(), map_df["lat"].to_numpy(), map_df[column].to_numpy(), title, palette)
+    with _lock:
+        _maps[key] = png
+        while len(_maps) > MAX_CACHED_MAPS:
+            _maps.popitem(last=False)
+    return png
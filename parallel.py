@@ -0,0 +1,204 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Execution en parallele par colonnes.
+# Le bloc de colonnes est copie une fois dans une memoire partagee (ordre Fortran : chaque
+# colonne est contigue) ; chaque processus du pool s'attache au bloc par son nom et traite
+# une plage de colonnes, sans que les donnees soient serialisees. Le resultat est ecrit dans
+# un second bloc partage (ou dans le premier, en place) puis relu par l'appelant.
+# Petites entrees : tout est fait dans le processus courant (demarrage du pool et copie
+# en memoire partagee plus couteux que le calcul).
+
+# En dessous de ce nombre de valeurs (lignes x colonnes), pas de parallelisme
+PARALLEL_MIN_CELLS = 2_000_000
+
+# Pool unique, cree a la premiere demande avec un processus par coeur et jamais remplace
+# (plusieurs sessions Streamlit peuvent l'utiliser en meme temps)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# Nombre de processus : None -> 1, negatif -> coeurs + 1 + n_jobs (-1 : tous), borne au
+# nombre de coeurs (taille du pool)
+def resolve_jobs(n_jobs):
+    if n_jobs is None:
+        return 1
+    cpus = os.cpu_count() or 1
+    if n_jobs < 0:
+        n_jobs = cpus + 1 + n_jobs
+    return max(1, min(n_jobs, cpus))
+
+
+def use_parallel(block, n_jobs):
+    return resolve_jobs(n_jobs) > 1 and block.ndim == 2 and block.shape[1] > 1 and block.size >= PARALLEL_MIN_CELLS
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn : pas de fork d'un processus multi-thread (Streamlit)
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+@atexit.register
+def _shutdown_pool():
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _shared(shape, dtype):
+    size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf, order="F")
+
+
+# Les processus "spawn" partagent le resource_tracker du parent : le bloc y est deja
+# enregistre, et c'est le parent qui le supprime (unlink) apres le calcul
+def _attach(name):
+    return shared_memory.SharedMemory(name=name)
+
+
+def _worker(task):
+    src_name, dst_name, shape, src_dtype, dst_dtype, start, stop, kernel, params, column_params = task
+    src_shm = _attach(src_name)
+    dst_shm = _attach(dst_name) if dst_name != src_name else src_shm
+    try:
+        src = np.ndarray(shape, dtype=src_dtype, buffer=src_shm.buf, order="F")[:, start:stop]
+        dst = np.ndarray(shape, dtype=dst_dtype, buffer=dst_shm.buf, order="F")[:, start:stop]
+        stats = kernel(src, dst, *column_params, **params)
+        del src, dst
+        return stats
+    finally:
+        src_shm.close()
+        if dst_shm is not src_shm:
+            dst_shm.close()
+
+
+def _concat(results):
+    if results[0] is None:
+        return None
+    if not isinstance(results[0], tuple):
+        return np.concatenate(results, axis=-1)
+    return tuple(np.concatenate(parts, axis=-1) for parts in zip(*results))
+
+
+# Applique kernel(src, dst, *column_params, **params) par plages de colonnes.
+# column_params : tableaux par colonne (derniere dimension = colonnes), decoupes comme le bloc.
+# out_dtype : type du resultat (None : meme type que le bloc, calcul en place dans la copie).
+# finish : fonction appliquee au resultat avant la liberation de la memoire partagee (par ex.
+# ecriture dans le DataFrame de sortie) ; sans finish, le resultat est copie hors du bloc.
+# Retourne (resultat ou finish(resultat), statistiques par colonne renvoyees par le kernel).
+def column_apply(block, kernel, n_jobs=None, out_dtype=None, column_params=(), finish=None, **params):
+    out_dtype = np.dtype(out_dtype or block.dtype)
+    if not use_parallel(block, n_jobs):
+        dst = np.empty(block.shape, dtype=out_dtype)
+        stats = kernel(block, dst, *column_params, **params)
+        return (finish(dst) if finish else dst), stats
+
+    workers = min(resolve_jobs(n_jobs), block.shape[1])
+    src_shm, src = _shared(block.shape, block.dtype)
+    src[...] = block
+    in_place = out_dtype == block.dtype
+    dst_shm, dst = (src_shm, src) if in_place else _shared(block.shape, out_dtype)
+    try:
+        ranges = np.array_split(np.arange(block.shape[1]), workers)
+        tasks = [(src_shm.name, dst_shm.name, block.shape, block.dtype, out_dtype, r[0], r[-1] + 1, kernel, params,
+                  tuple(np.asarray(p)[..., r[0]:r[-1] + 1] for p in column_params))
+                 for r in ranges if len(r)]
+        stats = _concat(list(_pool().map(_worker, tasks)))
+        result = finish(dst) if finish else np.array(dst, order="F")
+    finally:
+        del src, dst
+        src_shm.close()
+        src_shm.unlink()
+        if not in_place:
+            dst_shm.close()
+            dst_shm.unlink()
+    return result, stats
+
+
+# Statistiques par colonne uniquement (le bloc n'est pas modifie)
+def column_stats(block, kernel, n_jobs=None, **params):
+    if not use_parallel(block, n_jobs):
+        return kernel(block, **params)
+    return _shared_stats(block, kernel, n_jobs, params)
+
+
+def _shared_stats(block, kernel, n_jobs, params):
+    workers = min(resolve_jobs(n_jobs), block.shape[1])
+    shm, src = _shared(block.shape, block.dtype)
+    src[...] = block
+    try:
+        ranges = [r for r in np.array_split(np.arange(block.shape[1]), workers) if len(r)]
+        tasks = [(shm.name, shm.name, block.shape, block.dtype, block.dtype, r[0], r[-1] + 1, _stats_kernel,
+                  dict(params, kernel=kernel), ()) for r in ranges]
+        return _concat(list(_pool().map(_worker, tasks)))
+    finally:
+        del src
+        shm.close()
+        shm.unlink()
+
+
+def _stats_kernel(src, dst, kernel, **params):
+    return kernel(src, **params)
+
+
+# === Kernels (niveau module : transmis aux processus par reference) ===
+def minmax_stats(block):
+    offset = np.nanmin(block, axis=0)
+    scale = np.nanmax(block, axis=0) - offset
+    # Colonne constante : meme convention que MinMaxScaler
+    scale[scale == 0] = 1.0
+    return offset, scale
+
+
+def zscore_stats(block):
+    return np.nanmean(block, axis=0), np.nanstd(block, axis=0, ddof=1)
+
+
+def quantile_stats(block, q):
+    return np.nanquantile(block, q, axis=0)
+
+
+def affine_kernel(src, dst, offset, scale):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.subtract(src, offset, out=dst)
+        np.divide(dst, scale, out=dst)
+
+
+# Ecretage ; retourne le nombre de valeurs ecretees par colonne
+def clip_kernel(src, dst, lower, upper):
+    clipped = ((src < lower) | (src > upper)).sum(axis=0)
+    np.clip(src, lower, upper, out=dst)
+    return clipped
+
+
+# log1p ; retourne le nombre de valeurs devenues invalides par colonne
+def log_kernel(src, dst):
+    missing = np.isnan(src).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.log1p(src, out=dst)
+    return np.isnan(dst).sum(axis=0) - missing
+
+
+def fill_kernel(src, dst, values):
+    dst[...] = src
+    missing = np.isnan(dst)
+    dst[missing] = np.broadcast_to(values, dst.shape)[missing]
+
+
+def mean_stats(block):
+    return np.nanmean(block, axis=0)
+
+
+def median_stats(block):
+    return np.nanmedian(block, axis=0)
@@ -1,5 +1,6 @@
 import seaborn as sns
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import pandas as pd
 import numpy as np 
 import geopandas as gpd
@@ -10,9 +11,14 @@ from shapely import wkt
 from shapely.geometry import Polygon
 from scipy.stats import zscore
 import math
+import time
+from sketches import ColumnSketch
+from instrumentation import instrument
+from correlation import correlation_matrix, pair_columns, top_k_pairs
 
 
 
+@instrument
 def central_tendency(df,attrs):
     mean = df[attrs].mean()
     median = df[attrs].median()
@@ -23,6 +29,7 @@ def central_tendency(df,attrs):
     return mean , median , mode , symetric
 
 
+@instrument
 def quantiles(df, attr):
     quantiles = np.quantile(df[attr], [0, 0.25, 0.5, 0.75, 1.0])
     lower = quantiles[0]
@@ -36,6 +43,7 @@ def quantiles(df, attr):
     return quantiles, lower, upper, outliers
 0
 
+@instrument
 def missing_unique(df , attr):
     total_missing_values = df[attr].isnull().sum()
     unique = df[attr].unique()
@@ -43,31 +51,236 @@ def missing_unique(df , attr):
 
 
 
-def box_plots(df , Attr):
-    plt.boxplot(df[Attr])
+# Profil de toutes les colonnes numeriques en une passe sur un bloc 2-D :
+# un seul tri par colonne donne quantiles, mode, min/max, valeurs distinctes et outliers.
+# Retourne le tableau (une ligne par colonne) et les temps de chaque etape.
+@instrument
+def profile(df, cols=None):
+    timings = {}
+    start = step = time.perf_counter()
+
+    def lap(name):
+        nonlocal step
+        now = time.perf_counter()
+        timings[name] = now - step
+        step = now
+
+    if cols is None:
+        cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    block = df[cols].to_numpy(dtype="float64", copy=True)
+    n_rows = block.shape[0]
+    lap("extract")
+
+    missing = np.isnan(block).sum(axis=0)
+    count = n_rows - missing
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(block, axis=0) / count
+        variance = np.nansum((block - mean) ** 2, axis=0) / (count - 1)
+    variance[count < 2] = np.nan
+    lap("moments")
+
+    # Tri en place : les NaN se retrouvent en fin de colonne
+    block.sort(axis=0)
+    lap("sort")
+
+    # Quantiles (interpolation lineaire, comme np.quantile) lus dans les colonnes triees
+    last = np.maximum(count - 1, 0)
+    positions = np.outer([0, 0.25, 0.5, 0.75, 1.0], last)
+    low = np.floor(positions).astype(int)
+    high = np.ceil(positions).astype(int)
+    q_low = np.take_along_axis(block, low, axis=0) if n_rows else np.full(low.shape, np.nan)
+    q_high = np.take_along_axis(block, high, axis=0) if n_rows else np.full(high.shape, np.nan)
+    q = q_low + (q_high - q_low) * (positions - low)
+    q[:, count == 0] = np.nan
+    IQR = q[3] - q[1]
+    lower_bound = q[1] - 1.5 * IQR
+    upper_bound = q[3] + 1.5 * IQR
+    outliers = ((block < lower_bound) | (block > upper_bound)).sum(axis=0)
+
+    # Valeurs distinctes et mode a partir des plages de valeurs egales
+    changes = block[1:] != block[:-1]
+    valid = np.arange(1, n_rows)[:, None] < count
+    distinct = np.where(count > 0, 1 + (changes & valid).sum(axis=0), 0)
+    mode = np.full(len(cols), np.nan)
+    for j in range(len(cols)):
+        if count[j]:
+            starts = np.flatnonzero(np.r_[True, changes[:count[j] - 1, j]])
+            runs = np.diff(np.r_[starts, count[j]])
+            mode[j] = block[starts[np.argmax(runs)], j]
+    lap("order_statistics")
+
+    table = pd.DataFrame({
+        "count": count,
+        "mean": mean,
+        "median": q[2],
+        "mode": mode,
+        "variance": variance,
+        "std": np.sqrt(variance),
+        "min": q[0],
+        "max": q[4],
+        "range": q[4] - q[0],
+        "Q1": q[1],
+        "Q3": q[3],
+        "IQR": IQR,
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "outliers": outliers,
+        "missing": missing,
+        "distinct": distinct,
+    }, index=pd.Index(cols, name="column"))
+    timings["total"] = time.perf_counter() - start
+    return table, timings
+
+
+# Statistiques approchees d'une colonne trop grande pour la memoire :
+# chunks est un iterable de DataFrames (ex. pd.read_csv(..., chunksize=...)).
+# Le resultat est un ColumnSketch, fusionnable avec ceux d'autres processus (merge).
+def sketch_column(chunks, attr, k=256, p=14):
+    sketch = ColumnSketch(k=k, p=p)
+    for chunk in chunks:
+        sketch.update(chunk[attr].to_numpy())
+    return sketch
+
+
+# Equivalent en flux de quantiles() : quantiles approches, bornes exactes, erreur de rang
+@instrument
+def streaming_quantiles(chunks, attr, k=256):
+    summary = sketch_column(chunks, attr, k=k).summary()
+    q = summary["quantiles"]
+    return q, q[0], q[4], summary["quantile_rank_error"]
+
+
+# Equivalent en flux de missing_unique() : nombre de valeurs distinctes estime
+@instrument
+def streaming_missing_unique(chunks, attr, p=14):
+    summary = sketch_column(chunks, attr, p=p).summary()
+    return summary["missing"], summary["distinct"], summary["distinct_relative_error"]
+
+
+# Au-dela de ce nombre de lignes, les graphiques sont traces a partir de donnees pre-agregees
+# (histogrammes 1-D / 2-D, quartiles) : le temps de trace depend du nombre de bins.
+AGGREGATE_THRESHOLD = 50_000
+
+# Au-dela de MAX_HEATMAP_COLS colonnes, la heatmap se limite aux paires les plus correlees
+MAX_HEATMAP_COLS = 20
+MAX_HEATMAP_PAIRS = 10
+
+
+def _finite(values):
+    values = np.asarray(values, dtype="float64")
+    return values[np.isfinite(values)]
+
+
+def _use_aggregate(n, aggregate):
+    return n > AGGREGATE_THRESHOLD if aggregate is None else aggregate
+
+
+def draw_boxplot(ax, values, aggregate=None):
+    if not _use_aggregate(len(values), aggregate):
+        sns.boxplot(y=values, ax=ax)
+        return ax
+    values = _finite(values)
+    # Colonne sans valeur finie : axes vides, comme sns.boxplot
+    if values.size == 0:
+        return ax
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = values[(values >= lower) & (values <= upper)]
+    outside = values[(values < lower) | (values > upper)]
+    # Un echantillon des outliers suffit pour le trace
+    if outside.size > 1000:
+        outside = np.random.default_rng(0).choice(outside, 1000, replace=False)
+    stats = {"med": median, "q1": q1, "q3": q3, "whislo": inside.min(), "whishi": inside.max(), "fliers": outside}
+    ax.bxp([stats], showfliers=True)
+    return ax
+
+
+def draw_histogram(ax, values, bins=10, kde=False, aggregate=None, color='skyblue', edgecolor='black'):
+    if not _use_aggregate(len(values), aggregate):
+        sns.histplot(values, kde=kde, bins=bins, color=color, edgecolor=edgecolor, ax=ax)
+        return ax
+    values = _finite(values)
+    counts, edges = np.histogram(values, bins=bins)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color=color, edgecolor=edgecolor)
+    if kde and values.size > 1:
+        # KDE sur une grille fine : histogramme a 512 bins lisse par un noyau gaussien (Scott)
+        fine_counts, fine_edges = np.histogram(values, bins=512)
+        step = fine_edges[1] - fine_edges[0]
+        bandwidth = values.std() * values.size ** (-1 / 5)
+        if step > 0 and bandwidth > 0:
+            offsets = np.arange(-4 * bandwidth, 4 * bandwidth + step, step)
+            kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+            density = np.convolve(fine_counts, kernel / kernel.sum(), mode="same")
+            centers = (fine_edges[:-1] + fine_edges[1:]) / 2
+            ax.plot(centers, density * (edges[1] - edges[0]) / step, color=color)
+    ax.set_ylabel("Count")
+    return ax
+
+
+def draw_scatter(ax, x, y, aggregate=None, bins=200, color='skyblue', edgecolor='black'):
+    if not _use_aggregate(len(x), aggregate):
+        sns.scatterplot(x=x, y=y, color=color, edgecolor=edgecolor, ax=ax)
+        return ax
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    finite = np.isfinite(x) & np.isfinite(y)
+    # Aucun couple de valeurs : axes vides (histogram2d echoue sur un tableau vide)
+    if not finite.any():
+        return ax
+    counts, x_edges, y_edges = np.histogram2d(x[finite], y[finite], bins=bins)
+    # Carte de densite a la place des points
+    mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap="Blues",
+                         norm=LogNorm())
+    ax.figure.colorbar(mesh, ax=ax, label="Nombre de points")
+    return ax
+
+
+@instrument
+def box_plots(df , Attr, aggregate=None):
+    draw_boxplot(plt.gca(), df[Attr], aggregate)
     plt.title(f"Boxplot of {Attr}")
     plt.ylabel("Values")
     plt.show()
 
 
-def histogram(df , attr):
-    plt.hist(df[attr], bins=10, color='skyblue', edgecolor='black')
+@instrument
+def histogram(df , attr, aggregate=None):
+    draw_histogram(plt.gca(), df[attr], bins=10, aggregate=aggregate)
     plt.title("Histogram of "+ attr)
     plt.xlabel("Value")
     plt.ylabel("Frequency")
     plt.show()
 
 
-def scatter(df , attr1 , attr2):
-    sns.scatterplot(data = df ,x=attr1, y=attr2, color='skyblue', edgecolor='black')
+@instrument
+def scatter(df , attr1 , attr2, aggregate=None):
+    draw_scatter(plt.gca(), df[attr1], df[attr2], aggregate)
+    plt.xlabel(attr1)
+    plt.ylabel(attr2)
     plt.show()
 
 
-def correlation(df , cols):
-    correlation_matrix = df[cols].corr()
-    sns.heatmap(correlation_matrix, annot=True)
-    plt.title("correlation")
+# Heatmap limitee a un bloc de colonnes (annotations seulement si le bloc est petit)
+def draw_heatmap(ax, corr, block=None, annot_max=15):
+    if block is not None:
+        corr = corr.loc[block, block]
+    sns.heatmap(corr, ax=ax, annot=len(corr) <= annot_max, fmt=".2f", vmin=-1, vmax=1, cmap="coolwarm")
+    return ax
+
+
+# Matrice calculee par blocs (module correlation) ; la heatmap n'affiche que `block`
+# (par defaut les colonnes des MAX_HEATMAP_PAIRS paires les plus correlees)
+@instrument
+def correlation(df , cols, method="pearson", block=None, workers=None):
+    corr = correlation_matrix(df, cols, method=method, workers=workers)
+    if block is None and len(cols) > MAX_HEATMAP_COLS:
+        block = pair_columns(top_k_pairs(corr, MAX_HEATMAP_PAIRS))
+    fig, ax = plt.subplots()
+    draw_heatmap(ax, corr, block)
+    ax.set_title("correlation")
     plt.show()
+    return corr
 
 
 
@@ -9,161 +9,723 @@ from pathlib import Path
 from shapely import wkt
 from shapely.geometry import Polygon
 from scipy.stats import zscore
-from sklearn.preprocessing import MinMaxScaler
+import hashlib
 import math
+import time
+import tracemalloc
+from contextlib import nullcontext
 
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
 from shapely import wkt
+from ingestion import ingest
+from grid_lookup import GRID_LOOKUP_PATH, soil_index
+from soil_cache import load_soil_data
+from correlation import correlation_matrix
+from dedup import RowDeduplicator, comparable_values
+from instrumentation import instrument, tracing
+from cube import DEFAULT_TIME_CHUNK, ClimateCube
+import parallel
 
-# Fonction pour ajouter les saisons
-def add_seasons(data):
-    data['times'] = pd.to_datetime(data['time'])
-    
-    def get_season(date):
-        month = date.month
-        if month in [12, 1, 2]:
-            return 'Winter'
-        elif month in [3, 4, 5]:
-            return 'Spring'
-        elif month in [6, 7, 8]:
-            return 'Summer'
-        else:
-            return 'Autumn'
-    
-    data['season'] = data['times'].apply(get_season)
-    data = data.drop(columns=['times'])
+# Fonction pour importer les fichiers NetCDF WFDE5 (masque du pays + pool de processus)
+@instrument
+def load_climate_data(data_dir, country_shapefile, output="alldata.csv", variables=None, workers=None):
+    data, _ = ingest(data_dir, country_shapefile, output=output, variables=variables, workers=workers)
     return data
 
+CLIMATE_VARIABLES = ['PSurf', 'Qair', 'Rainf', 'Snowf', 'Tair', 'Wind']
+
+# Taille des chunks pour la lecture des gros fichiers climatiques
+DEFAULT_CHUNKSIZE = 1_000_000
+
+# Saison de chaque mois (indice 1..12)
+SEASON_BY_MONTH = np.array([None, 'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                            'Summer', 'Summer', 'Autumn', 'Autumn', 'Autumn', 'Winter'], dtype=object)
+
+
+# Fonction pour ajouter les saisons (sans colonne temporaire ni modification de l'entree)
+@instrument
+def add_seasons(data):
+    months = pd.to_datetime(data['time']).dt.month.to_numpy()
+    return data.assign(season=SEASON_BY_MONTH[months])
+
+
+# Etat persistant de l'agregation saisonniere : sommes et effectifs par (season, lon, lat)
+# Les sommes sont gardees en double-double (sums + compensation, TwoSum) : sums est
+# l'arrondi de la somme exacte, independant de l'ordre d'arrivee des mois. Ajouter les
+# nouveaux mois a un etat existant, dans n'importe quel ordre, donne donc exactement le meme
+# resultat qu'un recalcul complet.
+class SeasonAccumulator:
+    def __init__(self, variables=None):
+        self.variables = list(variables or CLIMATE_VARIABLES)
+        self.index = pd.MultiIndex.from_arrays([[], [], []], names=['season', 'lon', 'lat'])
+        self.sums = np.zeros((0, len(self.variables)), dtype='float64')
+        self.compensation = np.zeros((0, len(self.variables)), dtype='float64')
+        self.counts = np.zeros((0, len(self.variables)), dtype='int64')
+        self.months = set()
+
+    # check_months=False : un meme mois peut arriver en plusieurs morceaux (lecture par chunks)
+    def update(self, data, check_months=True):
+        times = pd.to_datetime(data['time'])
+        # Cle du mois sous forme AAAAMM
+        month_keys = times.dt.year * 100 + times.dt.month
+        new_months = set(month_keys.unique().tolist())
+        already = new_months & self.months
+        if already and check_months:
+            raise ValueError(f"Months already aggregated: {sorted(already)}")
+
+        values = data[self.variables].to_numpy(dtype='float64')
+        partial = pd.DataFrame(values, columns=self.variables)
+        keys = [month_keys.to_numpy(), SEASON_BY_MONTH[times.dt.month.to_numpy()],
+                data['lon'].to_numpy(), data['lat'].to_numpy()]
+        grouped = partial.groupby(keys)
+        partial_sums = grouped.sum()
+        partial_counts = grouped.count()
+        partial_sums.index.names = ['month', 'season', 'lon', 'lat']
+
+        cells = partial_sums.index.droplevel('month')
+        self._extend(cells.unique())
+        positions = self.index.get_indexer(cells)
+        # Lignes triees une fois par mois : chaque mois est une tranche contigue, dans
+        # laquelle une cellule n'apparait qu'une fois
+        months = partial_sums.index.get_level_values('month').to_numpy()
+        order = np.argsort(months, kind='stable')
+        bounds = np.flatnonzero(np.diff(months[order])) + 1
+        sums = partial_sums.to_numpy()[order]
+        counts = partial_counts.to_numpy()[order]
+        positions = positions[order]
+        for rows in np.split(np.arange(len(order)), bounds):
+            self._add(positions[rows], sums[rows])
+            self.counts[positions[rows]] += counts[rows]
+
+        self.months |= new_months
+        return self
+
+    # Somme compensee : sums + compensation reste egal a la somme exacte des valeurs ajoutees
+    def _add(self, rows, values):
+        high, low = _two_sum(self.sums[rows], values)
+        high, low = _two_sum(high, low + self.compensation[rows])
+        self.sums[rows] = high
+        self.compensation[rows] = low
+
+    def _extend(self, cells):
+        new_cells = cells[self.index.get_indexer(cells) < 0]
+        if len(new_cells):
+            self.index = self.index.append(new_cells)
+            self.index.names = ['season', 'lon', 'lat']
+            padding = len(new_cells), len(self.variables)
+            self.sums = np.vstack([self.sums, np.zeros(padding, dtype='float64')])
+            self.compensation = np.vstack([self.compensation, np.zeros(padding, dtype='float64')])
+            self.counts = np.vstack([self.counts, np.zeros(padding, dtype='int64')])
+
+    # Moyennes saisonnieres courantes, au meme format que aggregate_by_season
+    def means(self):
+        means = np.divide(self.sums, self.counts, out=np.full(self.sums.shape, np.nan), where=self.counts > 0)
+        result = pd.DataFrame(means, index=self.index, columns=self.variables)
+        return result.sort_index().reset_index()
+
+    def save(self, path):
+        pd.to_pickle({
+            'variables': self.variables,
+            'index': self.index,
+            'sums': self.sums,
+            'compensation': self.compensation,
+            'counts': self.counts,
+            'months': sorted(self.months),
+        }, path)
+
+    @classmethod
+    def load(cls, path):
+        state = pd.read_pickle(path)
+        accumulator = cls(state['variables'])
+        accumulator.index = state['index']
+        accumulator.sums = state['sums']
+        accumulator.compensation = state.get('compensation', np.zeros_like(state['sums']))
+        accumulator.counts = state['counts']
+        accumulator.months = set(state['months'])
+        return accumulator
+
+
+# Addition sans erreur (Knuth) : a + b = high + low exactement
+def _two_sum(a, b):
+    high = a + b
+    b_part = high - a
+    low = (a - (high - b_part)) + (b - b_part)
+    return high, low
+
+
 # Fonction pour regrouper par saisons
-def aggregate_by_season(data):
+# data : DataFrame, chemin d'un CSV, iterable de DataFrames (chunks) ou ClimateCube.
+# Un DataFrame en memoire (sans chunksize) est agrege en une fois par groupby, types conserves.
+# Avec un chemin ou un iterable, les chunks sont lus et agreges un par un (memoire bornee).
+# Avec un cube, c'est une moyenne le long de l'axe du temps par saison (chunksize : nombre
+# de pas de temps lus a la fois).
+@instrument
+def aggregate_by_season(data, chunksize=None, return_stats=False):
+    in_memory = isinstance(data, pd.DataFrame) and chunksize is None
+    chunks = None
+    if not in_memory and not isinstance(data, ClimateCube):
+        chunks = iter_chunks(data, chunksize or DEFAULT_CHUNKSIZE,
+                             usecols=['time', 'lon', 'lat'] + CLIMATE_VARIABLES)
+
+    # tracemalloc partage avec l'instrumentation (compteur d'utilisateurs, pic du processus)
+    with tracing() if return_stats else nullcontext():
+        if return_stats:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if in_memory:
+            result, n_chunks, n_rows = _aggregate_frame(data), 1, len(data)
+        elif chunks is None:
+            result, n_chunks, n_rows = _aggregate_cube(data, chunksize or DEFAULT_TIME_CHUNK)
+        else:
+            accumulator = SeasonAccumulator()
+            n_chunks = n_rows = 0
+            for chunk in chunks:
+                accumulator.update(chunk, check_months=False)
+                n_chunks += 1
+                n_rows += len(chunk)
+            result = accumulator.means()
+        if not return_stats:
+            return result
+        _, peak = tracemalloc.get_traced_memory()
+
+    stats = {
+        'chunks': n_chunks,
+        'rows': n_rows,
+        'seconds': time.perf_counter() - start,
+        'peak_memory_mb': peak / 2**20,
+    }
+    return result, stats
+
+
+def _aggregate_frame(data):
     data = add_seasons(data)
-    result = data.groupby(['season', 'lon', 'lat'])[['PSurf', 'Qair', 'Rainf', 'Snowf', 'Tair', 'Wind']].mean().reset_index()
-    return result
+    return data.groupby(['season', 'lon', 'lat'])[CLIMATE_VARIABLES].mean().reset_index()
+
+
+# Cube : moyenne par saison le long de l'axe du temps ; retourne (resultat, blocs, lignes)
+def _aggregate_cube(cube, time_chunk):
+    seasons = SEASON_BY_MONTH[pd.DatetimeIndex(cube.times).month]
+    groups, means = cube.group_means(seasons, time_chunk)
+    n_chunks = math.ceil(len(cube.times) / time_chunk)
+    return cube.grouped_frame(groups, means, 'season'), n_chunks, len(cube.times) * int(cube.mask.sum())
+
+
+# Decoupage d'une source (CSV, DataFrame ou iterable de DataFrames) en chunks
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+    if isinstance(source, (str, Path)):
+        yield from pd.read_csv(source, chunksize=chunksize, usecols=usecols)
+    elif isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    else:
+        yield from source
+
+
+# Une ligne par cellule (lon, lat), une colonne par variable et saison : PSurf_Autumn, ...
+@instrument
+def pivot_seasons(data, variables=None):
+    variables = [v for v in (variables or CLIMATE_VARIABLES) if v in data.columns]
+    pivot = data.pivot_table(index=['lon', 'lat'], columns='season', values=variables).reset_index()
+    pivot.columns = ["_".join(col).strip("_") for col in pivot.columns]
+    return pivot
+
+
+# Ajout des nouveaux mois a un etat sauvegarde (cree s'il n'existe pas encore)
+@instrument
+def update_season_state(new_data, state_path):
+    if Path(state_path).exists():
+        accumulator = SeasonAccumulator.load(state_path)
+    else:
+        accumulator = SeasonAccumulator()
+    accumulator.update(new_data)
+    accumulator.save(state_path)
+    return accumulator.means()
 
 # Fonction pour intégrer des données
-def merge_data(climatic_data, soil_data):
-    gdf_points = gpd.GeoDataFrame(
-        climatic_data,
-        geometry=gpd.points_from_xy(climatic_data.lon, climatic_data.lat),
+# La jointure spatiale est remplacee par une table (lon, lat) -> polygone persistee sur disque
+# max_distance (degres) : les points hors des polygones (cotes) prennent le polygone le plus
+# proche a moins de cette distance au lieu d'etre supprimes
+@instrument
+def merge_data(climatic_data, soil_data=None, lookup_path=GRID_LOOKUP_PATH, max_distance=None):
+    if soil_data is None:
+        soil_data = load_soil_data()
+    poly = soil_index(climatic_data["lon"].to_numpy(), climatic_data["lat"].to_numpy(), soil_data,
+                      lookup_path, max_distance)
+    keep = poly >= 0
+    left = climatic_data[keep]
+    index_right = pd.Series(soil_data.index.to_numpy()[poly[keep]], index=left.index, name="index_right")
+    right = soil_data.drop(columns="geometry").iloc[poly[keep]].set_index(left.index)
+    geometry = gpd.GeoSeries(gpd.points_from_xy(left.lon, left.lat), index=left.index, name="geometry")
+    merged_data = gpd.GeoDataFrame(
+        pd.concat([left, geometry, index_right, right], axis=1),
+        geometry="geometry",
         crs="EPSG:4326"
     )
-    soil_data['geometry'] = soil_data['geometry'].apply(wkt.loads)
-    gdf_polygons = gpd.GeoDataFrame(soil_data, geometry='geometry', crs="EPSG:4326")
-    merged_data = gpd.sjoin(gdf_points, gdf_polygons, how="inner", predicate="within")
     return merged_data
 
 
 
 
 
-def outlier(df, method, cols=None):
-    df_out = df.copy()  # Work on a copy to avoid modifying the original DataFrame
+# Gestion des outliers.
+# Par defaut toutes les bornes sont calculees en une passe sur le bloc NumPy des colonnes
+# choisies, puis les lignes sont filtrees une seule fois. sequential=True garde l'ancien
+# comportement (bornes recalculees colonne par colonne sur le DataFrame deja filtre).
+# return_report=True retourne aussi, par colonne, le nombre de lignes supprimees
+# (zscore, IQR), de valeurs ecretees (Clipping) ou de valeurs invalides (log).
+@instrument
+def outlier(df, method, cols=None, sequential=False, return_report=False, n_jobs=None):
+    if method not in ("zscore", "IQR", "Clipping", "log"):
+        raise ValueError("Method must be 'zscore', 'IQR', 'Clipping' or 'log'")
     if cols is None:
         cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    # Process only numeric columns
+    cols = [feature for feature in cols if np.issubdtype(df[feature].dtype, np.number)]
+
+    if sequential:
+        df_out, report = _outlier_sequential(df, method, cols)
+    else:
+        df_out, report = _outlier_batched(df, method, cols, n_jobs)
+    report = pd.Series(report, index=cols, name="outliers", dtype="int64")
+    return (df_out, report) if return_report else df_out
+
+
+# Bloc NumPy des colonnes : float32 si toutes les colonnes le sont, float64 sinon
+def _block(df, cols):
+    return df[cols].to_numpy(dtype=np.result_type(np.float32, *df[cols].dtypes))
+
+
+def _outlier_batched(df, method, cols, n_jobs=None):
+    if method == "Clipping":
+        return Clipper(cols=cols, n_jobs=n_jobs).fit(df).transform(df, return_report=True)
+
+    block = _block(df, cols)
+    if method == "log" and parallel.use_parallel(block, n_jobs):
+        return parallel.column_apply(block, parallel.log_kernel, n_jobs,
+                                     finish=lambda logged: _assign_block(df, cols, logged))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if method == "zscore":
+            mean = np.nanmean(block, axis=0, dtype="float64")
+            std = np.nanstd(block, axis=0, ddof=1, dtype="float64")
+            z_scores = (block - mean) / std
+            inside = (z_scores < 3) & (z_scores > -3)
+        elif method == "IQR":
+            Q1, Q3 = np.nanquantile(block, [0.25, 0.75], axis=0)
+            IQR = Q3 - Q1
+            inside = (block >= Q1 - 1.5 * IQR) & (block <= Q3 + 1.5 * IQR)
+        else:
+            logged = np.log1p(block)
+            report = (np.isnan(logged) & ~np.isnan(block)).sum(axis=0)
+            return _assign_block(df, cols, logged), report
+
+    # Un seul masque combine, un seul filtrage
+    keep = inside.all(axis=1)
+    return df[keep].copy(), (~inside).sum(axis=0)
+
+
+# Reecrit les colonnes traitees (les colonnes float gardent leur precision d'origine,
+# keep : autres colonnes remises a leur type d'origine)
+def _assign_block(df, cols, block, keep=()):
+    df_out = df.copy()
+    dtypes = {feature: df[feature].dtype for feature in cols
+              if np.issubdtype(df[feature].dtype, np.floating) or feature in keep}
+    df_out[cols] = pd.DataFrame(block, index=df.index, columns=cols).astype(dtypes)
+    return df_out
+
+
+def _outlier_sequential(df, method, cols):
+    df_out = df.copy()  # Work on a copy to avoid modifying the original DataFrame
+    report = []
     if method == "zscore":
         for feature in cols:
-            # Process only numeric columns
-            if np.issubdtype(df_out[feature].dtype, np.number):
-                # Calculate Z-score for each feature
-                z_scores = (df_out[feature] - df_out[feature].mean()) / df_out[feature].std()
-                # Filter to keep only rows within Z-score threshold
-                df_out = df_out[(z_scores < 3) & (z_scores > -3)]
-        return df_out
+            # Calculate Z-score for each feature
+            z_scores = (df_out[feature] - df_out[feature].mean()) / df_out[feature].std()
+            # Filter to keep only rows within Z-score threshold
+            kept = df_out[(z_scores < 3) & (z_scores > -3)]
+            report.append(len(df_out) - len(kept))
+            df_out = kept
 
     elif method == 'IQR':
         for feature in cols:
-            # Process only numeric columns
-            if np.issubdtype(df_out[feature].dtype, np.number):
-                Q1 = df_out[feature].quantile(0.25)
-                Q3 = df_out[feature].quantile(0.75)
-                IQR = Q3 - Q1
-                # Define lower and upper bounds
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                # Filter rows within the IQR range
-                df_out = df_out[(df_out[feature] >= lower_bound) & (df_out[feature] <= upper_bound)]
-        return df_out
+            Q1 = df_out[feature].quantile(0.25)
+            Q3 = df_out[feature].quantile(0.75)
+            IQR = Q3 - Q1
+            # Define lower and upper bounds
+            lower_bound = Q1 - 1.5 * IQR
+            upper_bound = Q3 + 1.5 * IQR
+            # Filter rows within the IQR range
+            kept = df_out[(df_out[feature] >= lower_bound) & (df_out[feature] <= upper_bound)]
+            report.append(len(df_out) - len(kept))
+            df_out = kept
 
     elif method == "Clipping":
         for feature in cols:
-            # Process only numeric columns
-            if np.issubdtype(df_out[feature].dtype, np.number):
-                # Clip values at the specified quantiles
-                df_out[feature] = df_out[feature].clip(lower=df_out[feature].quantile(0.05),
-                                                       upper=df_out[feature].quantile(0.95))
-        return df_out
+            # Clip values at the specified quantiles
+            lower, upper = df_out[feature].quantile(0.05), df_out[feature].quantile(0.95)
+            report.append(((df_out[feature] < lower) | (df_out[feature] > upper)).sum())
+            df_out[feature] = df_out[feature].clip(lower=lower, upper=upper)
+
     elif method == "log":
         for feature in cols:
-            if np.issubdtype(df_out[feature].dtype, np.number):
-                df_out[feature] = np.log1p(df_out[feature])
-        return df_out
+            logged = np.log1p(df_out[feature])
+            report.append((logged.isna() & df_out[feature].notna()).sum())
+            df_out[feature] = logged
+    return df_out, report
 
 
-def normalize_data(df, method, cols=None):
+# === Transformateurs : statistiques calculees une fois (fit) puis appliquees a chaque lot (transform) ===
+class Transformer:
+    def fit(self, df):
+        raise NotImplementedError
 
-    df_out = df.copy()  # Work on a copy to avoid modifying the original DataFrame
-    
+    def transform(self, df):
+        raise NotImplementedError
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def _check_fitted(self):
+        if not hasattr(self, "cols_"):
+            raise ValueError(f"{type(self).__name__} must be fitted before transform")
+
+    def save(self, path):
+        pd.to_pickle(self, path)
+
+    @staticmethod
+    def load(path):
+        return pd.read_pickle(path)
+
+
+# Transformateurs enregistres avant l'ajout de n_jobs : execution serielle
+def _jobs(transformer):
+    return getattr(transformer, "n_jobs", None)
+
+
+def _selected_cols(df, cols):
     if cols is None:
-        cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        return df.select_dtypes(include=[np.number]).columns.tolist()
+    return list(cols)
 
-    if method == 'minmax':
-        scaler = MinMaxScaler()  #
-        df_out[cols] = scaler.fit_transform(df_out[cols])
-        return df_out
 
-    elif method == 'zscore':
-        df_out[cols] = (df_out[cols] - df_out[cols].mean()) / df_out[cols].std()  
+# Normalisation Min-Max ou Z-score : (x - offset) / scale
+# n_jobs : colonnes reparties sur n_jobs processus (-1 : tous les coeurs) pour les gros blocs
+class Normalizer(Transformer):
+    def __init__(self, method='minmax', cols=None, n_jobs=None):
+        if method not in ('minmax', 'zscore'):
+            raise ValueError("Method should be 'minmax' or 'zscore'.")
+        self.method = method
+        self.cols = cols
+        self.n_jobs = n_jobs
+
+    def fit(self, df):
+        self.cols_ = _selected_cols(df, self.cols)
+        block = df[self.cols_].to_numpy(dtype="float64")
+        with np.errstate(invalid="ignore"):
+            if parallel.use_parallel(block, _jobs(self)):
+                kernel = parallel.minmax_stats if self.method == 'minmax' else parallel.zscore_stats
+                self.offset_, scale = parallel.column_stats(block, kernel, _jobs(self))
+            elif self.method == 'minmax':
+                self.offset_ = np.nanmin(block, axis=0) if len(block) else np.full(len(self.cols_), np.nan)
+                scale = np.nanmax(block, axis=0) - self.offset_ if len(block) else np.full(len(self.cols_), np.nan)
+                # Colonne constante : meme convention que MinMaxScaler
+                scale[scale == 0] = 1.0
+            else:
+                self.offset_ = np.nanmean(block, axis=0)
+                scale = np.nanstd(block, axis=0, ddof=1)
+        self.scale_ = scale
+        return self
+
+    def transform(self, df):
+        self._check_fitted()
+        df_out = df.copy()  # Work on a copy to avoid modifying the original DataFrame
+        block = df[self.cols_].to_numpy(dtype="float64")
+        if parallel.use_parallel(block, _jobs(self)):
+            def assign(normalized):
+                df_out[self.cols_] = normalized
+            parallel.column_apply(block, parallel.affine_kernel, _jobs(self),
+                                  column_params=(self.offset_, self.scale_), finish=assign)
+            return df_out
+        with np.errstate(invalid="ignore", divide="ignore"):
+            df_out[self.cols_] = (block - self.offset_) / self.scale_
         return df_out
 
+
+# Memes probabilites que pd.qcut (arrondies vers le haut si non representables en base 2)
+def _qcut_quantiles(num_bins):
+    quantiles = np.linspace(0, 1, num_bins + 1)
+    np.putmask(quantiles, num_bins * quantiles != np.arange(num_bins + 1), np.nextafter(quantiles, 1))
+    return quantiles
+
+
+# Quantiles par colonne : un seul tri du bloc (colonnes contigues, NaN en fin de ligne),
+# puis np.quantile sur la partie triee non manquante de chaque colonne
+def _column_quantiles(block, quantiles):
+    ordered = np.sort(block.T, axis=1)
+    counts = (~np.isnan(block)).sum(axis=0)
+    edges = np.full((len(quantiles), block.shape[1]), np.nan)
+    for j, count in enumerate(counts):
+        if count:
+            edges[:, j] = np.quantile(ordered[j, :count].astype('float64'), quantiles)
+    return edges
+
+
+# Code des valeurs manquantes ou hors des bornes apprises (codes uint8 : 255 bins au plus)
+MISSING_CODE = 255
+# Au-dela de ce nombre de bins, les codes sont calcules par np.searchsorted
+SEARCHSORTED_MIN_BINS = 16
+
+
+# Codes de bin d'un bloc de colonnes (edges : une colonne de bornes par colonne du bloc),
+# intervalles (a, b], le premier ferme a gauche comme include_lowest.
+# Peu de bins : code = nombre de bornes interieures < valeur, compare sur tout le bloc 2-D ;
+# sinon np.searchsorted colonne par colonne.
+def _bin_codes(block, out, edges):
+    if len(edges) - 1 <= SEARCHSORTED_MIN_BINS:
+        position = np.ones(block.shape, dtype='uint8')
+        for edge in edges[1:-1]:
+            position += block > edge
     else:
-        raise ValueError("Method should be 'minmax' or 'zscore'.")
+        position = np.column_stack([np.searchsorted(edges[:, j], block[:, j], side='left')
+                                    for j in range(block.shape[1])])
+        position[block == edges[0]] = 1
+    inside = (block >= edges[0]) & (block <= edges[-1])
+    out[...] = np.where(inside, position - 1, MISSING_CODE)
 
 
-def discretization(df, cols, num_bins, method='equal_frequency', label_by_avg=False):
-    df_out = df.copy()
+# Discretisation en intervalles de meme effectif ou de meme largeur.
+# Bornes de toutes les colonnes calculees en une passe (edges_ : num_bins + 1 lignes, une
+# colonne par attribut), codes de bin obtenus par searchsorted, puis soit des colonnes
+# categorielles (comme pd.cut), soit des codes uint8 (codes=True) avec label_table().
+# n_jobs : quantiles et codes calcules en parallele par colonnes pour les gros blocs.
+class Discretizer(Transformer):
+    def __init__(self, cols, num_bins, method='equal_frequency', label_by_avg=False, codes=False, n_jobs=None):
+        if method not in ('equal_frequency', 'equal_width'):
+            raise ValueError("Method must be 'equal_frequency' or 'equal_width'")
+        if not 0 < num_bins < MISSING_CODE:
+            raise ValueError(f"num_bins must be between 1 and {MISSING_CODE - 1}")
+        self.cols = cols
+        self.num_bins = num_bins
+        self.method = method
+        self.label_by_avg = label_by_avg
+        self.codes = codes
+        self.n_jobs = n_jobs
 
-    for col in cols:
-        if method == 'equal_frequency':
-            if label_by_avg:
-                bin_edges = pd.qcut(df_out[col], num_bins, retbins=True)[1]
-                bin_averages = [(bin_edges[i] + bin_edges[i+1]) / 2 for i in range(len(bin_edges) - 1)]
-                labels = bin_averages
-            else:
-                
-                labels = [f'cat {i+1}' for i in range(num_bins)]
-            df_out[f'{col}_EFD'] = pd.qcut(df_out[col], num_bins, labels=labels)
-
-        elif method == 'equal_width':
-            min_val = df_out[col].min()
-            max_val = df_out[col].max()
-            bin_edges = np.linspace(min_val, max_val, num_bins+1)  
-            
-            if label_by_avg:
-                
-                bin_averages = [(bin_edges[i] + bin_edges[i+1]) / 2 for i in range(len(bin_edges) - 1)]
-                labels = bin_averages
+    def fit(self, df):
+        self.cols_ = list(self.cols)
+        block = _block(df, self.cols_)
+        with np.errstate(invalid="ignore"):
+            if self.method == 'equal_frequency':
+                self.edges_ = parallel.column_stats(block, _column_quantiles, _jobs(self),
+                                                    quantiles=_qcut_quantiles(self.num_bins))
             else:
-                # Default behavior: use labels like 'Bin 1', 'Bin 2', etc.
-                labels = [f'Bin {i+1}' for i in range(num_bins)]
-            
-            df_out[f'{col}_EWD'] = pd.cut(df_out[col], bins=bin_edges, labels=labels, include_lowest=True)
+                # Meme type que les donnees (float32 reste float32, comme np.linspace sur min / max)
+                self.edges_ = np.linspace(np.nanmin(block, axis=0), np.nanmax(block, axis=0), self.num_bins + 1)
+        self.edges_ = self.edges_.reshape(self.num_bins + 1, len(self.cols_))
+        invalid = ~(np.diff(self.edges_, axis=0) > 0).all(axis=0)
+        if invalid.any():
+            col = self.cols_[np.flatnonzero(invalid)[0]]
+            raise ValueError(f"Bin edges must be unique for column '{col}': {self.edges_[:, self.cols_.index(col)]}")
+        return self
+
+    def _labels(self, j):
+        if self.label_by_avg:
+            return list((self.edges_[:-1, j] + self.edges_[1:, j]) / 2)
+        # Default behavior: use labels like 'cat 1' / 'Bin 1', etc.
+        prefix = 'cat' if self.method == 'equal_frequency' else 'Bin'
+        return [f'{prefix} {i+1}' for i in range(self.num_bins)]
+
+    # Table des labels : une ligne par (colonne, code) avec les bornes de l'intervalle
+    def label_table(self):
+        self._check_fitted()
+        return pd.DataFrame({
+            'column': np.repeat(self.cols_, self.num_bins),
+            'code': np.tile(np.arange(self.num_bins, dtype='uint8'), len(self.cols_)),
+            'label': [label for j in range(len(self.cols_)) for label in self._labels(j)],
+            'left': self.edges_[:-1].T.ravel(),
+            'right': self.edges_[1:].T.ravel(),
+        })
+
+    # Codes de bin uint8 (MISSING_CODE hors des bornes), par plages de colonnes si n_jobs
+    def bin_codes(self, df):
+        self._check_fitted()
+        block = _block(df, self.cols_)
+        return parallel.column_apply(block, _bin_codes, _jobs(self), 'uint8', column_params=(self.edges_,))[0]
 
+    def transform(self, df):
+        codes = self.bin_codes(df)
+        suffix = '_EFD' if self.method == 'equal_frequency' else '_EWD'
+        if self.codes:
+            columns = {f'{col}{suffix}': codes[:, j] for j, col in enumerate(self.cols_)}
         else:
-            raise ValueError("Method must be 'equal_frequency' or 'equal_width'")
+            categorical = codes.astype('int16')
+            categorical[codes == MISSING_CODE] = -1
+            columns = {f'{col}{suffix}': pd.Categorical.from_codes(categorical[:, j], self._labels(j), ordered=True)
+                       for j, col in enumerate(self.cols_)}
+        df_out = df.copy()
+        for name, values in columns.items():
+            df_out[name] = values
+        return df_out
+
+
+# Ecretage aux quantiles lower / upper
+class Clipper(Transformer):
+    def __init__(self, lower=0.05, upper=0.95, cols=None, n_jobs=None):
+        self.lower = lower
+        self.upper = upper
+        self.cols = cols
+        self.n_jobs = n_jobs
+
+    def fit(self, df):
+        self.cols_ = [feature for feature in _selected_cols(df, self.cols)
+                      if np.issubdtype(df[feature].dtype, np.number)]
+        with np.errstate(invalid="ignore"):
+            self.lower_, self.upper_ = parallel.column_stats(_block(df, self.cols_), parallel.quantile_stats,
+                                                             _jobs(self), q=[self.lower, self.upper])
+        return self
+
+    # return_report=True : retourne aussi le nombre de valeurs ecretees par colonne
+    def transform(self, df, return_report=False):
+        self._check_fitted()
+        block = _block(df, self.cols_)
+        # Colonnes entieres aux bornes entieres : restent entieres, comme Series.clip
+        integers = [feature for j, feature in enumerate(self.cols_)
+                    if np.issubdtype(df[feature].dtype, np.integer)
+                    and float(self.lower_[j]).is_integer() and float(self.upper_[j]).is_integer()]
+        df_out, clipped = parallel.column_apply(block, parallel.clip_kernel, _jobs(self),
+                                                column_params=(self.lower_, self.upper_),
+                                                finish=lambda values: _assign_block(df, self.cols_, values, integers))
+        return (df_out, clipped) if return_report else df_out
+
+
+@instrument
+def normalize_data(df, method, cols=None, n_jobs=None):
+    return Normalizer(method, cols, n_jobs).fit_transform(df)
 
+
+@instrument
+def discretization(df, cols, num_bins, method='equal_frequency', label_by_avg=False, codes=False, n_jobs=None):
+    return Discretizer(cols, num_bins, method, label_by_avg, codes, n_jobs).fit_transform(df)
+
+
+# Gestion des valeurs manquantes.
+# strategy : 'constant', 'mean', 'median', 'mode', 'drop_rows' ou 'drop_columns'
+# (les suppressions portent sur toutes les colonnes, comme dropna()).
+# n_jobs : remplissage (constante, moyenne, mediane) reparti par colonnes pour les gros blocs
+# de colonnes float.
+@instrument
+def fill_missing(df, cols, strategy, value=None, n_jobs=None):
+    if strategy in ('constant', 'mean', 'median') and _parallel_fill(df, cols, value, n_jobs):
+        return _fill_parallel(df, cols, strategy, value, n_jobs)
+    df_out = df.copy()
+    if strategy == 'constant':
+        # Colonnes categorielles (chaines du loader) : la valeur doit etre une categorie
+        for col in cols:
+            if isinstance(df_out[col].dtype, pd.CategoricalDtype) and value not in df_out[col].cat.categories:
+                df_out[col] = df_out[col].cat.add_categories([value])
+        df_out[cols] = df_out[cols].fillna(value)
+    elif strategy == 'mean':
+        df_out[cols] = df_out[cols].fillna(df_out[cols].mean())
+    elif strategy == 'median':
+        df_out[cols] = df_out[cols].fillna(df_out[cols].median())
+    elif strategy == 'mode':
+        for col in cols:
+            df_out[col] = df_out[col].fillna(df_out[col].mode()[0])
+    elif strategy == 'drop_rows':
+        df_out = df_out.dropna()
+    elif strategy == 'drop_columns':
+        df_out = df_out.dropna(axis=1)
+    else:
+        raise ValueError("Strategy must be 'constant', 'mean', 'median', 'mode', 'drop_rows' or 'drop_columns'")
     return df_out
 
 
-def eliminate_redundancies(df, method):
-    reduced_df = df.copy()
-    
-    if method == 'horizontal':  
-        reduced_df = reduced_df.drop_duplicates().reset_index(drop=True)
+def _parallel_fill(df, cols, value, n_jobs):
+    cols = list(cols)
+    if not cols or parallel.resolve_jobs(n_jobs) < 2 or len(df) * len(cols) < parallel.PARALLEL_MIN_CELLS:
+        return False
+    if not all(np.issubdtype(df[col].dtype, np.floating) for col in cols):
+        return False
+    return value is None or isinstance(value, (int, float))
+
+
+def _fill_parallel(df, cols, strategy, value, n_jobs):
+    cols = list(cols)
+    block = _block(df, cols)
+    if strategy == 'constant':
+        values = np.full(len(cols), value, dtype=block.dtype)
+    else:
+        kernel = parallel.mean_stats if strategy == 'mean' else parallel.median_stats
+        values = parallel.column_stats(block, kernel, n_jobs)
+    return parallel.column_apply(block, parallel.fill_kernel, n_jobs, column_params=(values,),
+                                 finish=lambda filled: _assign_block(df, cols, filled))[0]
+
+
+# Empreinte du contenu d'une colonne (ordre des lignes compris)
+def column_fingerprint(col):
+    hashes = pd.util.hash_array(comparable_values(col))
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+def _same_values(a, b):
+    a, b = comparable_values(a), comparable_values(b)
+    if a.dtype == object or b.dtype == object:
+        return pd.Series(a).equals(pd.Series(b))
+    return np.array_equal(a, b, equal_nan=True)
+
+
+# Colonnes identiques : une empreinte par colonne, comparaison exacte seulement entre
+# colonnes de meme empreinte (pas de transposition du DataFrame)
+def _duplicate_columns(df):
+    kept = {}
+    duplicates = {}
+    for name in df.columns:
+        candidates = kept.setdefault(column_fingerprint(df[name]), [])
+        for first in candidates:
+            if _same_values(df[first], df[name]):
+                duplicates[name] = first
+                break
+        else:
+            candidates.append(name)
+    return duplicates
+
+
+# Quasi-doublons : colonne numerique dont |correlation| avec une colonne gardee depasse le seuil
+def _correlated_columns(df, threshold):
+    corr = correlation_matrix(df).abs()
+    kept = []
+    duplicates = {}
+    for name in corr.columns:
+        above = corr.loc[name, kept]
+        above = above[above >= threshold]
+        if len(above):
+            duplicates[name] = above.idxmax()
+        else:
+            kept.append(name)
+    return duplicates
+
+
+# threshold (mode vertical) : supprime aussi les colonnes tres correlees a une colonne gardee
+# subset / tolerance (mode horizontal) : colonnes cles, arrondi des valeurs numeriques
+# return_report=True retourne aussi {colonne supprimee: colonne dont elle est le doublon}
+@instrument
+def eliminate_redundancies(df, method, threshold=None, subset=None, tolerance=None, return_report=False):
+    report = {}
+    if method == 'horizontal' and tolerance is not None:
+        with RowDeduplicator(subset, tolerance) as dedup:
+            reduced_df = dedup.process(df).reset_index(drop=True)
+    elif method == 'horizontal':  
+        reduced_df = df.drop_duplicates(subset=subset).reset_index(drop=True)
     elif method == 'vertical':  
-        reduced_df = reduced_df.loc[:, ~reduced_df.T.duplicated()]
+        report = _duplicate_columns(df)
+        reduced_df = df.drop(columns=list(report))
+        if threshold is not None:
+            correlated = _correlated_columns(reduced_df, threshold)
+            report.update(correlated)
+            reduced_df = reduced_df.drop(columns=list(correlated))
     else:
         raise ValueError("Method must be 'horizontal' or 'vertical'")
     
-    return reduced_df
+    return (reduced_df, report) if return_report else reduced_df
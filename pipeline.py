@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from part2 import (
+    aggregate_by_season,
+    discretization,
+    eliminate_redundancies,
+    fill_missing,
+    load_climate_data,
+    merge_data,
+    normalize_data,
+    outlier,
+    pivot_seasons,
+)
+from cube import ClimateCube
+from soil_cache import SOIL_PATH, file_sha1, load_soil_data
+
+# Execution sans navigateur d'une suite d'etapes de pretraitement decrite dans un fichier JSON :
+#   {"cache_dir": ".pipeline_cache", "output": "final_dataset.csv",
+#    "steps": [{"step": "read_csv", "path": "alldata.csv"}, {"step": "aggregate_by_season"}, ...]}
+# La sortie de chaque etape est gardee sous une cle = hash(cle de l'etape precedente, nom,
+# parametres, contenu des fichiers d'entree). Une nouvelle execution reprend donc a la
+# premiere etape modifiee et ne recalcule que la suite.
+
+DEFAULT_CONFIG = "pipeline.json"
+DEFAULT_CACHE_DIR = ".pipeline_cache"
+# Parametres designant des fichiers ou dossiers : leur contenu fait partie de la cle
+PATH_PARAMS = ("path", "data_dir", "country_shapefile", "soil_path")
+
+
+def ingest_step(data, data_dir, country_shapefile, output="alldata.csv", variables=None, workers=None):
+    return load_climate_data(data_dir, country_shapefile, output, variables, workers)
+
+
+def read_csv_step(data, path):
+    return pd.read_csv(path)
+
+
+# Cube en memory-map (ingestion.py --cube) ; mis en cache par son chemin, sans copie
+def read_cube_step(data, path):
+    return ClimateCube.load(path)
+
+
+def aggregate_step(data, chunksize=None):
+    return aggregate_by_season(data, chunksize)
+
+
+def pivot_step(data, variables=None):
+    return pivot_seasons(data, variables)
+
+
+# Fusion avec le sol ; la geometrie des points (redondante avec lon / lat) n'est pas gardee
+def merge_step(data, soil_path=SOIL_PATH, max_distance=None):
+    merged = merge_data(data, load_soil_data(soil_path), max_distance=max_distance)
+    return pd.DataFrame(merged.drop(columns="geometry"))
+
+
+def outlier_step(data, method, cols=None, n_jobs=None):
+    return outlier(data, method, cols, n_jobs=n_jobs)
+
+
+def fill_missing_step(data, cols, strategy, value=None, n_jobs=None):
+    return fill_missing(data, cols, strategy, value, n_jobs)
+
+
+def normalize_step(data, method="minmax", cols=None, n_jobs=None):
+    return normalize_data(data, method, cols, n_jobs)
+
+
+def discretize_step(data, cols, num_bins, method="equal_frequency", label_by_avg=False, codes=False, n_jobs=None):
+    return discretization(data, cols, num_bins, method, label_by_avg, codes, n_jobs)
+
+
+def dedup_step(data, method="horizontal", threshold=None, subset=None, tolerance=None):
+    return eliminate_redundancies(data, method, threshold=threshold, subset=subset, tolerance=tolerance)
+
+
+# Etapes disponibles : nom -> fonction(data, **params) qui retourne un nouveau DataFrame
+STEPS = {
+    "ingest": ingest_step,
+    "read_csv": read_csv_step,
+    "read_cube": read_cube_step,
+    "aggregate_by_season": aggregate_step,
+    "pivot": pivot_step,
+    "merge": merge_step,
+    "outlier": outlier_step,
+    "fill_missing": fill_missing_step,
+    "normalize": normalize_step,
+    "discretize": discretize_step,
+    "dedup": dedup_step,
+}
+
+
+# Empreinte d'un fichier (contenu) ou d'un dossier (noms, tailles et dates des fichiers)
+def path_fingerprint(path):
+    path = Path(path)
+    if path.is_dir():
+        listing = [(str(f.relative_to(path)), f.stat().st_size, f.stat().st_mtime_ns)
+                   for f in sorted(path.rglob("*")) if f.is_file()]
+        return hashlib.sha256(repr(listing).encode()).hexdigest()
+    if path.exists():
+        return file_sha1(path)
+    return None
+
+
+def step_key(previous, name, params):
+    inputs = {key: path_fingerprint(params[key]) for key in PATH_PARAMS if params.get(key) is not None}
+    payload = json.dumps([previous, name, params, inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    for step in config["steps"]:
+        if step.get("step") not in STEPS:
+            raise ValueError(f"Unknown pipeline step {step.get('step')!r}; choose among {sorted(STEPS)}")
+    return config
+
+
+# Execute les etapes ; retourne (donnees finales, rapport par etape).
+# Seule la derniere sortie en cache est relue : les etapes en amont ne sont pas chargees.
+def run_pipeline(config, force=False, verbose=True):
+    cache_dir = Path(config.get("cache_dir", DEFAULT_CACHE_DIR))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    steps = config["steps"]
+
+    keys, paths, key = [], [], None
+    for position, step in enumerate(steps):
+        params = {k: v for k, v in step.items() if k != "step"}
+        key = step_key(key, step["step"], params)
+        keys.append(key)
+        paths.append(cache_dir / f"{position:02d}_{step['step']}_{key[:16]}.pkl")
+
+    resume = -1
+    if not force:
+        resume = max((i for i, path in enumerate(paths) if path.exists()), default=-1)
+
+    data = pd.read_pickle(paths[resume]) if resume >= 0 else None
+    report = []
+    for position, step in enumerate(steps):
+        name = step["step"]
+        start = time.perf_counter()
+        if position > resume:
+            params = {k: v for k, v in step.items() if k != "step"}
+            data = STEPS[name](data, **params)
+            pd.to_pickle(data, paths[position])
+        seconds = time.perf_counter() - start
+        cached = position <= resume
+        report.append({"step": name, "key": keys[position], "cached": cached, "seconds": seconds,
+                       "shape": data.shape if position >= resume else None})
+        if verbose:
+            status = "cache" if cached else "calcul"
+            print(f"[{position + 1}/{len(steps)}] {name:20s} {status:6s} {seconds:8.2f} s", flush=True)
+
+    if config.get("output"):
+        data.to_csv(config["output"], index=False)
+    return data, report
+
+
+# Supprime les sorties en cache qui ne correspondent plus a aucune etape de la config
+def prune_cache(config, report):
+    cache_dir = Path(config.get("cache_dir", DEFAULT_CACHE_DIR))
+    current = {entry["key"][:16] for entry in report}
+    for path in cache_dir.glob("*.pkl"):
+        if path.stem.rsplit("_", 1)[-1] not in current:
+            path.unlink()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline de pretraitement (etapes de part2, avec cache)")
+    parser.add_argument("config", nargs="?", default=DEFAULT_CONFIG)
+    parser.add_argument("--force", action="store_true", help="recalcule toutes les etapes")
+    parser.add_argument("--prune", action="store_true", help="supprime les sorties en cache obsoletes")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    _, report = run_pipeline(config, force=args.force)
+    if args.prune:
+        prune_cache(config, report)
+    computed = sum(not entry["cached"] for entry in report)
+    print(f"{computed} etape(s) recalculee(s) sur {len(report)}")
+
+
+if __name__ == "__main__":
+    main()
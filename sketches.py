@@ -0,0 +1,244 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Estimateurs en flux, alimentes chunk par chunk et fusionnables (merge) entre processus.
+
+
+# Moyenne / variance exactes en flux (formules de Chan pour la fusion)
+class RunningMoments:
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        nan = np.isnan(values)
+        values = values[~nan]
+        chunk = RunningMoments()
+        chunk.missing = int(nan.sum())
+        if values.size:
+            chunk.count = values.size
+            chunk.mean = float(values.mean())
+            chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+            chunk.min = float(values.min())
+            chunk.max = float(values.max())
+        return self.merge(chunk)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.missing += other.missing
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+# Sketch de quantiles de type KLL : des compacteurs de capacite k par niveau.
+# Un element du niveau h represente 2**h valeurs. Compacter un niveau trie (garder un
+# element sur deux) deplace le rang de n'importe quelle valeur d'au plus 2**h : la somme
+# de ces poids donne une borne deterministe de l'erreur de rang.
+class QuantileSketch:
+    def __init__(self, k=256, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.error_weight = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.error_weight += other.error_weight
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size > self.k:
+                items = np.sort(items)
+                # Nombre pair d'elements compactes, le plus grand reste au niveau h si impair
+                kept = items[items.size - items.size % 2:]
+                pairs = items[:items.size - items.size % 2]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[h] = kept
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.error_weight += 2 ** h
+            h += 1
+
+    def quantile(self, q):
+        q = np.atleast_1d(np.asarray(q, dtype="float64"))
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = q * cumulative[-1]
+        index = np.minimum(np.searchsorted(cumulative, ranks, side="left"), items.size - 1)
+        return items[index]
+
+    # Borne de l'erreur de rang normalisee (fraction de n)
+    def rank_error(self):
+        return self.error_weight / self.n if self.n else 0.0
+
+
+# Compteur de valeurs distinctes HyperLogLog (2**p registres)
+class DistinctSketch:
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype="uint8")
+
+    def update(self, values):
+        values = pd.Series(values)
+        values = values[values.notna()].to_numpy()
+        if values.size == 0:
+            return self
+        hashes = pd.util.hash_array(values)
+        index = (hashes >> np.uint64(64 - self.p)).astype("int64")
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Position du premier bit a 1 dans les 64 - p bits restants
+        bit_length = np.frexp(rest.astype("float64"))[1]
+        rho = (64 - self.p - bit_length + 1).astype("uint8")
+        np.maximum.at(self.registers, index, rho)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge DistinctSketch with different precisions")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype("float64"))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    # Erreur relative type (ecart-type) de l'estimation
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.registers.size)
+
+
+# Les trois estimateurs pour une colonne
+class ColumnSketch:
+    def __init__(self, k=256, p=14, seed=None):
+        self.moments = RunningMoments()
+        self.quantiles = QuantileSketch(k, seed)
+        self.distinct = DistinctSketch(p)
+
+    def update(self, values):
+        self.moments.update(values)
+        self.quantiles.update(values)
+        self.distinct.update(values)
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        return self
+
+    def summary(self):
+        q = self.quantiles.quantile([0, 0.25, 0.5, 0.75, 1.0])
+        # Min et max sont exacts
+        q[0], q[-1] = self.moments.min, self.moments.max
+        return {
+            "count": self.moments.count,
+            "missing": self.moments.missing,
+            "mean": self.moments.mean,
+            "variance": self.moments.variance,
+            "std": self.moments.std,
+            "quantiles": q,
+            "quantile_rank_error": self.quantiles.rank_error(),
+            "distinct": self.distinct.count(),
+            "distinct_relative_error": self.distinct.relative_error(),
+        }
+
+
+# Precision et vitesse des sketches comparees aux fonctions exactes de part1
+def benchmark(rows=10**6, chunksize=10**5, distinct=10**5, seed=0):
+    from part1 import missing_unique, quantiles
+
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, distinct, rows).astype("float64") + rng.normal(0, 0.1, rows).round(1)
+    values[rng.random(rows) < 0.01] = np.nan
+    df = pd.DataFrame({"x": values})
+
+    start = time.perf_counter()
+    sketch = ColumnSketch(seed=seed)
+    for begin in range(0, rows, chunksize):
+        sketch.update(values[begin:begin + chunksize])
+    summary = sketch.summary()
+    sketch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact_q = quantiles(df.dropna(), "x")[0]
+    missing, unique = missing_unique(df, "x")
+    exact_time = time.perf_counter() - start
+
+    clean = np.sort(values[~np.isnan(values)])
+    probs = np.array([0.25, 0.5, 0.75])
+    ranks = np.searchsorted(clean, summary["quantiles"][1:4]) / clean.size
+    exact_distinct = pd.Series(unique).nunique()
+    return {
+        "rows": rows,
+        "sketch_seconds": sketch_time,
+        "exact_seconds": exact_time,
+        "quantile_rank_error": float(np.max(np.abs(ranks - probs))),
+        "quantile_rank_error_bound": summary["quantile_rank_error"],
+        "quartiles_sketch": summary["quantiles"][1:4].tolist(),
+        "quartiles_exact": exact_q[1:4].tolist(),
+        "distinct_sketch": summary["distinct"],
+        "distinct_exact": exact_distinct,
+        "distinct_relative_error": abs(summary["distinct"] - exact_distinct) / exact_distinct,
+        "distinct_relative_error_std": summary["distinct_relative_error"],
+        "missing_sketch": summary["missing"],
+        "missing_exact": int(missing),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des sketches face aux calculs exacts")
+    parser.add_argument("--rows", type=int, default=10**6)
+    parser.add_argument("--chunksize", type=int, default=10**5)
+    parser.add_argument("--distinct", type=int, default=10**5)
+    args = parser.parse_args()
+    for key, value in benchmark(args.rows, args.chunksize, args.distinct).items():
+        print(f"{key:30s} {value}")
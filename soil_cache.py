@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pas de cache binaire sans pyarrow
+    pa = None
+
+SOIL_PATH = "soil_dz_allprops.csv"
+BOUNDS = ["minx", "miny", "maxx", "maxy"]
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Cache a cote du CSV : soil_dz_allprops.parquet
+def cache_path_for(path):
+    return Path(path).with_suffix(".parquet")
+
+
+def _from_csv(path):
+    soil_data = pd.read_csv(path)
+    geometry = shapely.from_wkt(soil_data.pop("geometry").to_numpy())
+    soil_data[BOUNDS] = shapely.bounds(geometry)
+    return soil_data, geometry
+
+
+def _write_cache(cache_path, soil_data, geometry, source_hash):
+    table = pa.Table.from_pandas(soil_data, preserve_index=False)
+    table = table.append_column("geometry", pa.array(shapely.to_wkb(geometry), type=pa.binary()))
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"source_sha1"] = source_hash.encode()
+    # Fichier temporaire du meme dossier puis renommage atomique (lecteurs concurrents)
+    tmp = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        pq.write_table(table.replace_schema_metadata(metadata), tmp)
+        os.replace(tmp, cache_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _read_cache(cache_path, source_hash):
+    if not cache_path.exists():
+        return None
+    try:
+        table = pq.read_table(cache_path)
+    except (OSError, pa.ArrowInvalid):
+        # Cache tronque ou corrompu : considere comme perime, reconstruit depuis le CSV
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(b"source_sha1", b"").decode() != source_hash:
+        return None
+    soil_data = table.to_pandas()
+    geometry = shapely.from_wkb(soil_data.pop("geometry").to_numpy())
+    return soil_data, geometry
+
+
+# Chargement des donnees de sol avec geometries deja construites.
+# Le cache Parquet (WKB + boites englobantes) est reconstruit seulement si le CSV change.
+# Chaque appel retourne un nouveau GeoDataFrame : l'appelant peut le modifier sans risque.
+def load_soil_data(path=SOIL_PATH, use_cache=True, with_bounds=False):
+    cached = None
+    if use_cache and pa is not None:
+        cache_path = cache_path_for(path)
+        source_hash = file_sha1(path)
+        cached = _read_cache(cache_path, source_hash)
+
+    if cached is None:
+        soil_data, geometry = _from_csv(path)
+        if use_cache and pa is not None:
+            _write_cache(cache_path, soil_data, geometry, source_hash)
+    else:
+        soil_data, geometry = cached
+
+    if not with_bounds:
+        soil_data = soil_data.drop(columns=BOUNDS)
+    return gpd.GeoDataFrame(soil_data, geometry=np.asarray(geometry, dtype=object), crs="EPSG:4326")
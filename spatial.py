@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import shapely
+
+# Point dans polygone pour les points de la grille climatique.
+# STRtree sur les polygones prepares : la requete par boites englobantes donne les paires
+# (point, polygone) candidates, puis contains_xy teste toutes les paires en un appel vectorise.
+# Les coordonnees sont arrondies (grille reguliere) : chaque cellule distincte est testee
+# une seule fois et le resultat est diffuse a toutes les lignes (saisons, mois, ...).
+
+DECIMALS = 6
+
+
+class PolygonIndex:
+    def __init__(self, polygons):
+        self.polygons = np.asarray(polygons, dtype=object)
+        shapely.prepare(self.polygons)
+        self.tree = shapely.STRtree(self.polygons)
+
+    # Position du premier polygone contenant chaque point (-1 sinon).
+    # max_distance (unites des coordonnees, degres en EPSG:4326) : un point hors de tous les
+    # polygones prend le polygone le plus proche s'il est a moins de max_distance.
+    def locate(self, xs, ys, max_distance=None):
+        xs = np.asarray(xs, dtype="float64")
+        ys = np.asarray(ys, dtype="float64")
+        points = shapely.points(xs, ys)
+        poly = np.full(len(points), len(self.polygons), dtype="int64")
+
+        point_idx, poly_idx = self.tree.query(points)
+        inside = shapely.contains_xy(self.polygons[poly_idx], xs[point_idx], ys[point_idx])
+        # Plusieurs polygones : on garde le premier (comme la jointure spatiale precedente)
+        np.minimum.at(poly, point_idx[inside], poly_idx[inside])
+
+        missing = np.flatnonzero(poly == len(self.polygons))
+        if max_distance is not None and missing.size:
+            near_point, near_poly = self.tree.query_nearest(points[missing], max_distance=max_distance,
+                                                            all_matches=True)
+            np.minimum.at(poly, missing[near_point], near_poly)
+
+        poly[poly == len(self.polygons)] = -1
+        return poly.astype("int32")
+
+
+# Cellules distinctes de la grille (coordonnees arrondies) et code de cellule par ligne
+def grid_cells(lons, lats, decimals=DECIMALS):
+    lons = np.round(np.asarray(lons, dtype="float64"), decimals)
+    lats = np.round(np.asarray(lats, dtype="float64"), decimals)
+    codes, cells = pd.MultiIndex.from_arrays([lons, lats]).factorize()
+    return codes, cells.get_level_values(0).to_numpy(), cells.get_level_values(1).to_numpy()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Les modules du projet sont a la racine du depot
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
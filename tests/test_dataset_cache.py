@@ -0,0 +1,38 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from dataset_cache import DatasetCache
+
+
+def test_evict_skips_files_in_use(tmp_path, monkeypatch):
+    cache = DatasetCache(tmp_path, max_size_mb=1e6)
+    df = pd.DataFrame({"x": np.arange(1000, dtype="float64")})
+    for i, key in enumerate(["busy", "old", "new"]):
+        cache.put(key, df)
+        os.utime(cache._path(key), (i, i))
+
+    # Fichier ouvert par un lecteur : la suppression echoue
+    unlink = Path.unlink
+
+    def locked_unlink(path, *args, **kwargs):
+        if path.stem == "busy":
+            raise PermissionError(path)
+        return unlink(path, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "unlink", locked_unlink)
+    # Place pour deux fichiers sur trois
+    cache.max_size_mb = cache.size_mb() * 0.7
+    cache.evict()
+    assert sorted(p.stem for p in tmp_path.glob("*.feather")) == ["busy", "new"]
+
+    # Liberee : supprimee en premier a l'eviction suivante (la plus ancienne)
+    monkeypatch.setattr(Path, "unlink", unlink)
+    cache.max_size_mb = cache.size_mb() * 0.6
+    cache.evict()
+    assert sorted(p.stem for p in tmp_path.glob("*.feather")) == ["new"]
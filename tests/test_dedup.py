@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from dedup import RowDeduplicator, row_hashes
+
+
+def test_number_and_string_are_different_rows():
+    df = pd.DataFrame({"id": [1, "1", 1, "1"], "texture": ["sand"] * 4})
+    with RowDeduplicator() as dedup:
+        unique = dedup.process(df)
+    assert unique.index.tolist() == [0, 1]
+
+
+def test_equal_numbers_hash_alike_across_dtypes():
+    numeric = pd.DataFrame({"a": [1.0, np.nan, 2.0]})
+    mixed = pd.DataFrame({"a": [True, None, 2]}, dtype=object)
+    assert np.array_equal(row_hashes(numeric), row_hashes(mixed))
+
+
+def test_duplicates_across_chunks_with_mixed_columns():
+    first = pd.DataFrame({"a": ["x", 1, pd.Timestamp("2020-01-01")]}, dtype=object)
+    second = pd.DataFrame({"a": [1.0, "1", pd.Timestamp("2020-01-01"), "x"]}, dtype=object)
+    with RowDeduplicator() as dedup:
+        dedup.process(first)
+        assert dedup.process(second)["a"].tolist() == ["1"]
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from part2 import fill_missing
+
+
+def test_constant_fill_on_category_column():
+    df = pd.DataFrame({
+        "texture": pd.Categorical(["sand", None, "clay", None]),
+        "ph": [6.5, np.nan, 7.1, 5.9],
+    })
+    out = fill_missing(df, ["texture"], "constant", "Unknown")
+    assert isinstance(out["texture"].dtype, pd.CategoricalDtype)
+    assert out["texture"].tolist() == ["sand", "Unknown", "clay", "Unknown"]
+    # Entree inchangee
+    assert df["texture"].isna().sum() == 2
+    assert "Unknown" not in df["texture"].cat.categories
+
+
+def test_constant_fill_with_existing_category():
+    df = pd.DataFrame({"texture": pd.Categorical(["sand", None, "clay"])})
+    out = fill_missing(df, ["texture"], "constant", "clay")
+    assert out["texture"].tolist() == ["sand", "clay", "clay"]
+    assert list(out["texture"].cat.categories) == ["clay", "sand"]
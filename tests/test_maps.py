@@ -0,0 +1,44 @@
+import numpy as np
+
+import maps
+
+
+def regular_points():
+    lons, lats = np.meshgrid(np.arange(-2, 3, 0.5), np.arange(30, 34, 0.5))
+    lons, lats = lons.ravel(), lats.ravel()
+    return lons, lats, np.arange(len(lons), dtype="float64")
+
+
+def test_regular_grid_is_rasterized():
+    lons, lats, values = regular_points()
+    grid, extent = maps.grid_raster(lons, lats, values)
+    assert grid.shape == (8, 10)
+    assert np.array_equal(np.sort(grid.ravel()), values)
+    assert extent == [-2.25, 2.75, 29.75, 33.75]
+
+
+def test_jittered_grid_is_not_rasterized():
+    lons, lats, values = regular_points()
+    jitter = np.random.default_rng(0).uniform(-1e-5, 1e-5, len(lons))
+    assert maps.grid_raster(lons + jitter, lats, values) is None
+
+
+def test_irregular_points_are_not_rasterized():
+    rng = np.random.default_rng(1)
+    lons, lats = rng.uniform(-10, 12, 500), rng.uniform(18, 38, 500)
+    assert maps.grid_raster(lons, lats, rng.normal(size=500)) is None
+
+
+def test_raster_size_is_capped():
+    lons = np.array([0.0, 0.001, 20.0])
+    lats = np.array([0.0, 0.001, 20.0])
+    assert maps.grid_raster(lons, lats, np.ones(3)) is None
+
+
+def test_render_map_falls_back_to_points(monkeypatch):
+    # Fond de carte vide : pas de telechargement Natural Earth
+    monkeypatch.setattr(maps, "base_layer", lambda: np.zeros((4, 4, 4), dtype=np.uint8))
+    rng = np.random.default_rng(2)
+    lons, lats = rng.uniform(-10, 12, 200), rng.uniform(18, 38, 200)
+    png = maps.render_map(lons, lats, rng.normal(size=200), "test", "viridis")
+    assert png.startswith(b"\x89PNG")
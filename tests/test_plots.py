@@ -0,0 +1,23 @@
+import numpy as np
+from matplotlib.figure import Figure
+
+from part1 import AGGREGATE_THRESHOLD, draw_boxplot, draw_scatter
+
+
+def test_scatter_of_all_nan_values_above_threshold():
+    ax = Figure().add_subplot()
+    values = np.full(AGGREGATE_THRESHOLD + 1, np.nan)
+    assert draw_scatter(ax, values, values) is ax
+    assert not ax.collections
+
+
+def test_scatter_without_any_complete_pair():
+    ax = Figure().add_subplot()
+    x = np.arange(AGGREGATE_THRESHOLD + 1, dtype="float64")
+    y = np.full(len(x), np.nan)
+    assert draw_scatter(ax, x, y) is ax
+
+
+def test_boxplot_of_all_nan_values_above_threshold():
+    ax = Figure().add_subplot()
+    assert draw_boxplot(ax, np.full(AGGREGATE_THRESHOLD + 1, np.nan)) is ax
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from part2 import CLIMATE_VARIABLES, aggregate_by_season, update_season_state
+
+MONTHS = 36
+
+
+# 36 mois sur une petite grille, valeurs float64 (comme lues du CSV) avec des manquantes
+def monthly_data(cells=50, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2019-01-01", periods=MONTHS, freq="MS")
+    lon, lat = np.meshgrid(np.arange(10, dtype="float32"), np.arange(cells // 10, dtype="float32"))
+    data = pd.DataFrame({
+        "time": np.repeat(times.to_numpy(), cells),
+        "lon": np.tile(lon.ravel(), MONTHS),
+        "lat": np.tile(lat.ravel(), MONTHS),
+    })
+    for variable in CLIMATE_VARIABLES:
+        values = rng.normal(rng.uniform(-1e3, 1e5), rng.uniform(1e-6, 1e3), len(data))
+        values[rng.random(len(data)) < 0.05] = np.nan
+        data[variable] = values
+    return data
+
+
+# Reference independante : saison par mois puis groupby pandas sur toutes les lignes
+SEASONS = {12: "Winter", 1: "Winter", 2: "Winter", 3: "Spring", 4: "Spring", 5: "Spring",
+           6: "Summer", 7: "Summer", 8: "Summer", 9: "Autumn", 10: "Autumn", 11: "Autumn"}
+
+
+def reference(chunks):
+    data = pd.concat(chunks, ignore_index=True)
+    data["season"] = pd.to_datetime(data["time"]).dt.month.map(SEASONS)
+    expected = data.groupby(["season", "lon", "lat"])[CLIMATE_VARIABLES].mean().reset_index()
+    return expected.astype({variable: "float64" for variable in CLIMATE_VARIABLES})
+
+
+def assert_matches_reference(result, chunks):
+    expected = reference(chunks)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12, check_dtype=False)
+
+
+def incremental(data, months, state_path):
+    result = None
+    for month in months:
+        result = update_season_state(data[data["time"] == month], state_path)
+    return result
+
+
+@pytest.mark.parametrize("order", ["chronological", "reversed", "shuffled"])
+def test_incremental_matches_full_aggregation(tmp_path, order):
+    data = monthly_data()
+    months = list(data["time"].unique())
+    if order == "reversed":
+        months = months[::-1]
+    elif order == "shuffled":
+        months = list(np.random.default_rng(1).permutation(months))
+
+    result = incremental(data, months, tmp_path / "state.pkl")
+
+    assert_matches_reference(result, [data])
+    # Sommes exactes : le resultat ne depend pas de l'ordre des mois
+    assert result.equals(incremental(data, list(data["time"].unique()), tmp_path / "other.pkl"))
+
+
+@pytest.mark.parametrize("seed", [None, 2])
+def test_chunked_aggregation_matches_reference(seed):
+    data = monthly_data()
+    if seed is not None:
+        # Lignes melangees : chaque chunk contient des morceaux de plusieurs mois et saisons
+        data = data.sample(frac=1, random_state=seed).reset_index(drop=True)
+    chunks = [data.iloc[start:start + 77] for start in range(0, len(data), 77)]
+    assert_matches_reference(aggregate_by_season(iter(chunks)), chunks)
+    assert_matches_reference(aggregate_by_season(data, chunksize=77), chunks)
+
+
+def test_season_split_across_chunks():
+    data = monthly_data()
+    # Decembre 2019 d'un cote, janvier et fevrier 2020 de l'autre : meme hiver
+    december = data[data["time"] == "2019-12-01"]
+    january_february = data[data["time"].isin(pd.to_datetime(["2020-01-01", "2020-02-01"]))]
+    chunks = [december, january_february]
+    result = aggregate_by_season(iter(chunks))
+    assert set(result["season"]) == {"Winter"}
+    assert_matches_reference(result, chunks)
+
+
+def test_nan_only_groups_stay_missing(tmp_path):
+    data = monthly_data()
+    cell = (data["lon"] == 0) & (data["lat"] == 0)
+    summer = pd.to_datetime(data["time"]).dt.month.isin([6, 7, 8])
+    data.loc[cell & summer, "Rainf"] = np.nan
+    chunks = [data.iloc[start:start + 500] for start in range(0, len(data), 500)]
+
+    result = aggregate_by_season(iter(chunks))
+    assert_matches_reference(result, chunks)
+    row = (result["season"] == "Summer") & (result["lon"] == 0) & (result["lat"] == 0)
+    assert result.loc[row, "Rainf"].isna().all()
+    assert result.loc[row, "Tair"].notna().all()
+
+    months = list(data["time"].unique())
+    assert_matches_reference(incremental(data, months, tmp_path / "state.pkl"), chunks)
+
+
+def test_month_added_twice_is_rejected(tmp_path):
+    data = monthly_data()
+    first = data[data["time"] == data["time"].iloc[0]]
+    update_season_state(first, tmp_path / "state.pkl")
+    with pytest.raises(ValueError):
+        update_season_state(first, tmp_path / "state.pkl")
+
+
+def test_in_memory_aggregation_keeps_dtypes():
+    data = monthly_data()
+    data[CLIMATE_VARIABLES] = data[CLIMATE_VARIABLES].astype("float32")
+    result = aggregate_by_season(data)
+    assert (result[CLIMATE_VARIABLES].dtypes == "float32").all()
+    chunked = aggregate_by_season(data, chunksize=77)
+    np.testing.assert_allclose(result[CLIMATE_VARIABLES], chunked[CLIMATE_VARIABLES], rtol=1e-6)